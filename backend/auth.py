@@ -2,20 +2,73 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
+import time
 import os
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ttl_cache import TTLCache
+
+# Cost factor for new hashes; existing hashes with a different cost are upgraded on login
+BCRYPT_ROUNDS = 12
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a bounded thread pool keeps hashing off the event loop
+_hash_executor: Optional[ThreadPoolExecutor] = None
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "minex_secret_key_change_in_production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 
+def configure_from_env():
+    """
+    Apply SECRET_KEY / BCRYPT_ROUNDS / TOKEN_CACHE_SIZE once the environment (.env)
+    is loaded. A changed SECRET_KEY drops every cached verification; each worker
+    picks up a rotated key when it restarts.
+    """
+    global SECRET_KEY, BCRYPT_ROUNDS
+    secret_key = os.environ.get("SECRET_KEY", SECRET_KEY)
+    if secret_key != SECRET_KEY:
+        SECRET_KEY = secret_key
+        flush_token_cache()
+    BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", BCRYPT_ROUNDS))
+    pwd_context.update(bcrypt__rounds=BCRYPT_ROUNDS)
+    token_cache.configure_from_env()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when a hash was made with a different scheme or cost than the current one"""
+    return pwd_context.needs_update(hashed_password)
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        workers = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+    return _hash_executor
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), get_password_hash, password)
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -26,9 +79,48 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def sign(message: str) -> str:
+    """HMAC-SHA256 of a message with SECRET_KEY, for short-lived signed links"""
+    return hmac.new(SECRET_KEY.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+def verify_signature(message: str, signature: str) -> bool:
+    return hmac.compare_digest(sign(message).encode(), signature.encode())
+
+class _TokenCache(TTLCache):
+    """Bounded LRU of verified tokens; entries expire with the token"""
+    
+    def __init__(self, maxsize: int = 10000):
+        super().__init__(maxsize, clock=time.time)
+    
+    def get(self, token: str) -> Optional[dict]:
+        # Keyed by the whole token, so a reused signature never maps to another payload
+        payload = self.lookup(token)
+        return dict(payload) if payload is not None else None
+    
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            self.store(token, dict(payload), exp)
+    
+    def configure_from_env(self):
+        """Apply TOKEN_CACHE_SIZE once the environment is loaded"""
+        self.maxsize = int(os.environ.get("TOKEN_CACHE_SIZE", self.maxsize))
+
+token_cache = _TokenCache()
+
+def flush_token_cache():
+    """Drop all cached verifications (done by configure_from_env when SECRET_KEY changes)"""
+    token_cache.clear()
+
 def decode_access_token(token: str):
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    token_cache.put(token, payload)
+    return payload
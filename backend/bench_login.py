@@ -0,0 +1,97 @@
+"""
+Login Throughput Benchmark for MINEX GLOBAL Platform
+
+Local mode compares bcrypt verification on the event loop against the
+bounded hashing pool, reporting throughput and the worst event-loop stall:
+
+    python bench_login.py --requests 64
+
+HTTP mode fires concurrent logins at a running server:
+
+    python bench_login.py --url http://localhost:8001 --email masteruser@gmail.com --password password
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from auth import get_password_hash, verify_password, verify_password_async
+
+
+async def _measure_stalls(stop: asyncio.Event, stalls: list, interval: float = 0.005):
+    """Record how late a periodic tick fires, i.e. how long the loop was blocked"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def _run_local(mode: str, hashed: str, requests: int) -> dict:
+    stop, stalls = asyncio.Event(), []
+    ticker = asyncio.create_task(_measure_stalls(stop, stalls))
+
+    async def inline_verify():
+        return verify_password("password", hashed)
+
+    verify = inline_verify if mode == "inline" else (lambda: verify_password_async("password", hashed))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    return {
+        "mode": mode,
+        "logins_per_sec": round(requests / elapsed, 1),
+        "max_loop_stall_ms": round(max(stalls, default=0) * 1000, 1),
+    }
+
+
+async def _run_http(url: str, email: str, password: str, requests: int, concurrency: int) -> dict:
+    import aiohttp
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(f"{url}/api/auth/login", json={"email": email, "password": password}) as response:
+                    await response.read()
+                    assert response.status == 200, f"Login failed: {response.status}"
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "logins_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login / password hashing throughput benchmark")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Benchmark a running server instead of local hashing")
+    parser.add_argument("--email", default="masteruser@gmail.com")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+
+    if args.url:
+        print(asyncio.run(_run_http(args.url.rstrip("/"), args.email, args.password, args.requests, args.concurrency)))
+        return
+
+    hashed = get_password_hash("password")
+    for mode in ("inline", "pooled"):
+        print(asyncio.run(_run_local(mode, hashed, args.requests)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Blob Storage Service for MINEX GLOBAL Platform
+Content-addressed (SHA-256) storage for uploaded images, backed by GridFS
+or the local filesystem, so documents only hold a small reference.
+Each blob records the users allowed to read it (owner_ids).
+"""
+import os
+import hashlib
+import logging
+import tempfile
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Uploads are spooled in memory up to this size, then to a temp file
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Magic bytes -> content type; anything else is rejected
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class BlobTooLargeError(ValueError):
+    """Raised when an upload exceeds the size limit"""
+
+
+class UnsupportedBlobError(ValueError):
+    """Raised when an upload is not a supported image type"""
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def blob_url(sha256: str) -> str:
+    return f"/api/blobs/{sha256}"
+
+
+class BlobStore:
+    def __init__(self):
+        self.db = None
+        self.backend = "gridfs"
+        self.root: Optional[Path] = None
+        self.max_upload_bytes = 10 * 1024 * 1024
+        self._bucket = None
+
+    def set_db(self, db):
+        """Set database reference and read BLOB_STORE / BLOB_STORE_PATH / MAX_UPLOAD_BYTES"""
+        self.db = db
+        self.backend = os.environ.get("BLOB_STORE", "gridfs")
+        self.max_upload_bytes = int(os.environ.get("MAX_UPLOAD_BYTES", self.max_upload_bytes))
+        if self.backend == "filesystem":
+            self.root = Path(os.environ.get("BLOB_STORE_PATH", Path(__file__).parent / "blobs"))
+            self.root.mkdir(parents=True, exist_ok=True)
+        else:
+            self._bucket = AsyncIOMotorGridFSBucket(db, bucket_name="blobs")
+        logger.info(f"Blob store using {self.backend} backend")
+
+    def _path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None,
+                          owner_id: Optional[str] = None) -> dict:
+        """
+        Hash and spool an upload chunk by chunk, enforcing the size limit, then
+        store it once per distinct content and record owner_id as one of its owners.
+        Returns the blob metadata.
+        """
+        max_bytes = max_bytes or self.max_upload_bytes
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BlobTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                digest.update(chunk)
+                # The spool rolls over to disk past SPOOL_MAX_MEMORY
+                await asyncio.to_thread(spool.write, chunk)
+
+            content_type = sniff_image_type(head)
+            if not content_type:
+                raise UnsupportedBlobError("Only PNG, JPEG, GIF and WebP images are supported")
+
+            sha256 = digest.hexdigest()
+            existing = await self.db.blobs.find_one({"sha256": sha256}, {"_id": 0})
+            if existing:
+                if owner_id and owner_id not in existing.get("owner_ids", []):
+                    await self.add_owner(sha256, owner_id)
+                return existing
+
+            spool.seek(0)
+            if self.backend == "filesystem":
+                await asyncio.to_thread(self._write_file, sha256, spool)
+            else:
+                # The content hash is also the file id, so a concurrent upload of the
+                # same content collides on the unique GridFS indexes instead of duplicating it
+                try:
+                    await self._bucket.upload_from_stream_with_id(sha256, sha256, spool, chunk_size_bytes=255 * 1024)
+                except DuplicateKeyError:
+                    logger.info(f"Blob {sha256} already stored by a concurrent upload")
+
+        blob = {
+            "sha256": sha256,
+            "size": size,
+            "content_type": content_type,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        if owner_id:
+            update = {"$setOnInsert": blob, "$addToSet": {"owner_ids": owner_id}}
+        else:
+            update = {"$setOnInsert": {**blob, "owner_ids": []}}
+        await self.db.blobs.update_one({"sha256": sha256}, update, upsert=True)
+        return blob
+
+    async def add_owner(self, sha256: str, owner_id: str):
+        """Let another user read a blob (identical content uploaded by several users is stored once)"""
+        await self.db.blobs.update_one({"sha256": sha256}, {"$addToSet": {"owner_ids": owner_id}})
+
+    async def save_upload(self, upload, max_bytes: Optional[int] = None, owner_id: Optional[str] = None) -> dict:
+        """Store a FastAPI UploadFile without reading it into memory at once"""
+        async def chunks():
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        return await self.save_stream(chunks(), max_bytes, owner_id)
+
+    @asynccontextmanager
+    async def spool_upload(self, upload, max_bytes: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Copy an UploadFile to a temp file chunk by chunk, failing as soon as it exceeds
+        the size limit; yields the file path and removes the file afterwards
+        """
+        max_bytes = max_bytes or self.max_upload_bytes
+        size = 0
+        fd, path = tempfile.mkstemp(prefix="upload.")
+        try:
+            # Disk writes run in a worker thread so a slow disk does not stall the event loop
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise BlobTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                    await asyncio.to_thread(f.write, chunk)
+            yield path
+        finally:
+            await asyncio.to_thread(os.unlink, path)
+
+    async def save_bytes(self, data: bytes, max_bytes: Optional[int] = None, owner_id: Optional[str] = None) -> dict:
+        async def chunks():
+            for i in range(0, len(data), CHUNK_SIZE):
+                yield data[i:i + CHUNK_SIZE]
+        return await self.save_stream(chunks(), max_bytes, owner_id)
+
+    def _write_file(self, sha256: str, spool):
+        path = self._path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temp file per writer; concurrent writers of the same content each rename a complete copy
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{sha256}.", delete=False) as f:
+            try:
+                while True:
+                    chunk = spool.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+    async def get(self, sha256: str) -> Optional[dict]:
+        """Blob metadata, or None"""
+        return await self.db.blobs.find_one({"sha256": sha256}, {"_id": 0})
+
+    async def read_bytes(self, sha256: str) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks(sha256)])
+
+    async def iter_chunks(self, sha256: str) -> AsyncIterator[bytes]:
+        """Stream a blob's content"""
+        if self.backend == "filesystem":
+            f = await asyncio.to_thread(open, self._path(sha256), "rb")
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                f.close()
+        else:
+            stream = await self._bucket.open_download_stream_by_name(sha256)
+            while True:
+                chunk = await stream.readchunk()
+                if not chunk:
+                    break
+                yield chunk
+
+
+# Global instance
+blob_store = BlobStore()
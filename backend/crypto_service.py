@@ -1,20 +1,94 @@
 """
 Crypto Price Service for MINEX GLOBAL Platform
-Using CoinGecko API for real-time cryptocurrency prices
+Using CoinGecko API for real-time cryptocurrency prices.
+A background refresher keeps prices in memory; requests never wait on CoinGecko.
+Across workers, one leader (holding a lease in MongoDB) fetches and publishes
+a shared snapshot that the other workers follow.
 """
 import os
+import json
+import time
+import uuid
+import hashlib
+import socket
 import logging
 import aiohttp
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import asyncio
 
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_ID = "latest"
+
+# CoinGecko ids per /simple/price request
+FETCH_BATCH_SIZE = 50
+
+# Currencies balances are valued in by default
+VALUATION_SYMBOLS = ("BTC", "ETH")
+
+
+def encode_prices(prices: List[dict]) -> Tuple[bytes, str]:
+    """JSON body (as FastAPI would render it) and a strong ETag derived from it"""
+    body = json.dumps(prices, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return body, f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and stays open for an
+    exponentially growing delay (capped at `max_delay`) before allowing a retry
+    """
+    def __init__(self, failure_threshold: int = 3, base_delay: float = 60.0, max_delay: float = 1800.0):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.trips = 0
+    
+    @property
+    def state(self) -> str:
+        if self.consecutive_failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.opened_until else "half_open"
+    
+    def allow(self) -> bool:
+        return time.monotonic() >= self.opened_until
+    
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_until - time.monotonic())
+    
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            exponent = self.consecutive_failures - self.failure_threshold + 1
+            delay = min(self.base_delay * (2 ** exponent), self.max_delay)
+            self.opened_until = time.monotonic() + delay
+            self.trips += 1
+            logger.warning(f"Price upstream circuit open for {delay:.0f}s after {self.consecutive_failures} failures")
+    
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+            "trips": self.trips
+        }
+
+
 class CryptoPriceService:
     BASE_URL = "https://api.coingecko.com/api/v3"
     
-    # Supported cryptocurrencies
+    # Default coin universe; admins can replace it via settings (crypto_coins)
     SUPPORTED_COINS = {
         'bitcoin': 'BTC',
         'ethereum': 'ETH',
@@ -31,92 +105,455 @@ class CryptoPriceService:
     }
     
     def __init__(self):
+        self.db = None
         self.cache: Dict[str, dict] = {}
+        # coin id -> {"symbol", "refresh_seconds"}; refresh_seconds None follows the global interval
+        self.coins: Dict[str, dict] = {}
+        self._by_symbol: Dict[str, str] = {}
+        self.coin_fetched_at: Dict[str, float] = {}  # coin id -> epoch seconds of its last price
+        self._attempted_at: Dict[str, float] = {}  # So coins upstream does not know are not retried every tick
+        self.set_coins(None)
+        # Formatted and encoded once per snapshot, so cache hits do no work
+        self.formatted: List[dict] = []
+        self.payload: Optional[Tuple[bytes, str]] = None
+        self._default_payload: Optional[Tuple[bytes, str]] = None
         self.cache_duration = timedelta(minutes=1)  # Cache for 1 minute
         self.last_fetch: Optional[datetime] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.fetches = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=100)  # Seconds, most recent fetches
+        self.coalesced = 0  # Callers that joined an in-flight fetch
+        self.stale_served = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.base_url = self.BASE_URL
+        self.refresh_interval = 60.0
+        self.breaker = CircuitBreaker()
+        self.is_running = False
+        self._refresher: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self._leadership_listeners: List[Callable[[bool], None]] = []
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self.snapshot_version = 0
+        self.poll_interval = 5.0
+    
+    def set_db(self, db):
+        """Set database reference for the shared snapshot and leader lease"""
+        self.db = db
+    
+    def set_coins(self, coins: Optional[List[dict]]):
+        """Replace the coin universe ([{"id", "symbol", "refresh_seconds"}]); None restores the defaults"""
+        if not coins:
+            coins = [{"id": coin_id, "symbol": symbol} for coin_id, symbol in self.SUPPORTED_COINS.items()]
+        self.coins = {
+            c["id"]: {"symbol": c["symbol"].upper(), "refresh_seconds": c.get("refresh_seconds")}
+            for c in coins
+        }
+        self._by_symbol = {coin["symbol"]: coin_id for coin_id, coin in self.coins.items()}
+        if self.cache:
+            self.formatted = self._format_prices(self.cache)
+            self.payload = encode_prices(self.formatted)
+            self._notify()
+    
+    def due_coins(self, now: Optional[float] = None) -> List[str]:
+        """Coins whose own refresh interval has elapsed since their last price"""
+        now = now if now is not None else time.time()
+        return [
+            coin_id for coin_id, coin in self.coins.items()
+            if now - max(self.coin_fetched_at.get(coin_id, 0), self._attempted_at.get(coin_id, 0))
+            >= (coin["refresh_seconds"] or self.refresh_interval)
+        ]
+    
+    def on_update(self, callback: Callable[[List[dict]], None]):
+        """Register a callback run with the formatted prices after every successful fetch"""
+        self._listeners.append(callback)
+    
+    def on_leadership_change(self, callback: Callable[[bool], None]):
+        """Register a callback run with the new state whenever this worker gains or loses leadership"""
+        self._leadership_listeners.append(callback)
+    
+    def _set_leader(self, leader: bool):
+        logger.info(f"Price refresher {'acquired' if leader else 'lost'} leadership ({self.worker_id})")
+        self.is_leader = leader
+        for callback in self._leadership_listeners:
+            try:
+                callback(leader)
+            except Exception as e:
+                logger.error(f"Leadership listener failed: {e}")
+    
+    async def start(self):
+        """
+        Open the shared HTTP session and start the background refresher (called
+        on app startup). Reads COINGECKO_BASE_URL and CRYPTO_REFRESH_SECONDS.
+        """
+        self._get_session()
+        if not self.is_running:
+            self.base_url = os.environ.get("COINGECKO_BASE_URL", self.base_url).rstrip("/")
+            self.refresh_interval = float(os.environ.get("CRYPTO_REFRESH_SECONDS", self.refresh_interval))
+            self.poll_interval = min(self.poll_interval, self.refresh_interval)
+            self.cache_duration = timedelta(seconds=self.refresh_interval)
+            self.breaker.base_delay = self.refresh_interval
+            # Warm start: serve the last shared snapshot instead of placeholders
+            try:
+                await self._sync_snapshot()
+            except Exception as e:
+                logger.error(f"Could not load the shared price snapshot: {e}")
+            self.is_running = True
+            self._refresher = asyncio.create_task(self._refresh_loop())
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """The shared HTTP session, opened on first use"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=10,
+                limit_per_host=4,
+                ttl_dns_cache=300,
+                keepalive_timeout=120,
+                enable_cleanup_closed=True
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10, connect=5),
+                headers={"Accept": "application/json"}
+            )
+        return self.session
+    
+    async def close(self):
+        """Stop the refresher and close the shared HTTP session (called on app shutdown)"""
+        self.is_running = False
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+        if self.is_leader and self.db is not None:
+            # Hand over leadership right away instead of waiting for the lease to lapse
+            await self.db.crypto_snapshots.update_one(
+                {"snapshot_id": SNAPSHOT_ID, "leader": self.worker_id},
+                {"$set": {"lease_until": datetime.now(timezone.utc).isoformat()}}
+            )
+            self._set_leader(False)
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    def stats(self) -> dict:
+        """Fetch counters and latency over the most recent fetches"""
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+        return {
+            "fetches": self.fetches,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            **self.freshness(),
+            "refresher_running": self.is_running,
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "snapshot_version": self.snapshot_version,
+            "coins": len(self.coins),
+            "coins_due": len(self.due_coins()),
+            "circuit": self.breaker.stats(),
+            "last_latency_ms": round(self.latencies[-1] * 1000, 1) if self.latencies else None,
+            "p50_latency_ms": percentile(0.5),
+            "p95_latency_ms": percentile(0.95),
+            "max_latency_ms": round(latencies[-1] * 1000, 1) if latencies else None
+        }
         
-    async def _fetch_prices(self) -> Dict[str, dict]:
+    async def _fetch_prices(self, coin_ids: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Fetch prices for the given coins (default: all) in concurrent batches; partial results are kept"""
+        coin_ids = list(self.coins) if coin_ids is None else coin_ids
+        attempted = time.time()
+        self._attempted_at.update({coin_id: attempted for coin_id in coin_ids})
+        batches = [coin_ids[i:i + FETCH_BATCH_SIZE] for i in range(0, len(coin_ids), FETCH_BATCH_SIZE)]
+        results = await asyncio.gather(*(self._fetch_batch(batch) for batch in batches))
+        merged: Dict[str, dict] = {}
+        for result in results:
+            merged.update(result)
+        return merged
+    
+    async def _fetch_batch(self, coin_ids: List[str]) -> Dict[str, dict]:
         """Fetch prices from CoinGecko API"""
         try:
-            coin_ids = ','.join(self.SUPPORTED_COINS.keys())
-            url = f"{self.BASE_URL}/simple/price"
+            url = f"{self.base_url}/simple/price"
             params = {
-                'ids': coin_ids,
+                'ids': ','.join(coin_ids),
                 'vs_currencies': 'usd',
                 'include_24hr_change': 'true',
                 'include_market_cap': 'true'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=10) as response:
+            session = self._get_session()
+            self.fetches += 1
+            start = time.perf_counter()
+            try:
+                async with session.get(url, params=params) as response:
                     if response.status == 200:
                         data = await response.json()
                         return data
                     else:
                         logger.error(f"CoinGecko API error: {response.status}")
+                        self.failures += 1
                         return {}
+            finally:
+                self.latencies.append(time.perf_counter() - start)
         except asyncio.TimeoutError:
             logger.error("CoinGecko API timeout")
+            self.failures += 1
             return {}
         except Exception as e:
             logger.error(f"Error fetching crypto prices: {str(e)}")
+            self.failures += 1
             return {}
     
+    def _start_flight(self, key: str, fetch) -> asyncio.Task:
+        """Return the in-flight fetch for a key, starting one if there is none"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.create_task(fetch())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        return task
+    
+    async def _single_flight(self, key: str, fetch) -> Dict[str, dict]:
+        """Run at most one fetch per key; concurrent callers await the same task"""
+        # Shielded so a cancelled request does not cancel the fetch other callers wait on
+        return await asyncio.shield(self._start_flight(key, fetch))
+    
+    def _apply(self, raw_prices: Dict[str, dict], fetched_at: datetime, version: int = 0,
+               coin_fetched_at: Optional[Dict[str, float]] = None):
+        """Make a snapshot current in this worker and notify listeners"""
+        self.cache = raw_prices
+        self.last_fetch = fetched_at
+        if coin_fetched_at is not None:
+            self.coin_fetched_at = coin_fetched_at
+        self.snapshot_version = version
+        self.formatted = self._format_prices(raw_prices)
+        self.payload = encode_prices(self.formatted)
+        self._notify()
+    
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback(self.formatted)
+            except Exception as e:
+                logger.error(f"Price update listener failed: {e}")
+    
+    async def _refresh(self, coin_ids: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Fetch prices (all coins, or just those given), publish the merged snapshot and apply it"""
+        fetched = await self._fetch_prices(coin_ids)
+        if fetched:
+            fetched_at = datetime.now(timezone.utc)
+            coin_fetched_at = {**self.coin_fetched_at, **{coin_id: fetched_at.timestamp() for coin_id in fetched}}
+            raw_prices = {coin_id: data for coin_id, data in {**self.cache, **fetched}.items() if coin_id in self.coins}
+            version = self.snapshot_version
+            if self.db is not None:
+                try:
+                    snapshot = await self.db.crypto_snapshots.find_one_and_update(
+                        {"snapshot_id": SNAPSHOT_ID},
+                        {"$set": {
+                            "raw": raw_prices,
+                            "fetched_at": fetched_at.isoformat(),
+                            "coin_fetched_at": coin_fetched_at
+                        }, "$inc": {"version": 1}},
+                        projection={"_id": 0, "version": 1},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER
+                    )
+                    version = snapshot["version"]
+                except Exception as e:
+                    logger.error(f"Failed to publish price snapshot: {e}")
+            self._apply(raw_prices, fetched_at, version, coin_fetched_at)
+        return fetched
+    
+    async def _acquire_lease(self) -> bool:
+        """Take or renew the refresher lease; only the holder fetches from upstream"""
+        if self.db is None:
+            return True
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.crypto_snapshots.find_one_and_update(
+                {"snapshot_id": SNAPSHOT_ID, "$or": [
+                    {"leader": self.worker_id},
+                    {"lease_until": {"$lt": now.isoformat()}},
+                    {"leader": {"$exists": False}}
+                ]},
+                {"$set": {
+                    "leader": self.worker_id,
+                    "lease_until": (now + timedelta(seconds=self.refresh_interval * 3)).isoformat()
+                }},
+                projection={"_id": 1},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another worker holds a live lease, so the upsert collided with its document
+            return False
+        return True
+    
+    async def _sync_snapshot(self):
+        """Apply the shared snapshot if it is newer than ours"""
+        if self.db is None:
+            return
+        snapshot = await self.db.crypto_snapshots.find_one(
+            {"snapshot_id": SNAPSHOT_ID, "version": {"$gt": self.snapshot_version}},
+            {"_id": 0, "raw": 1, "fetched_at": 1, "version": 1, "coin_fetched_at": 1}
+        )
+        if snapshot and snapshot.get("raw"):
+            self._apply(
+                snapshot["raw"], datetime.fromisoformat(snapshot["fetched_at"]),
+                snapshot["version"], snapshot.get("coin_fetched_at", {})
+            )
+    
+    async def _tick(self):
+        leader = await self._acquire_lease()
+        if leader != self.is_leader:
+            self._set_leader(leader)
+        
+        if not leader:
+            await self._sync_snapshot()
+            return
+        
+        due = self.due_coins()
+        if not due or not self.breaker.allow():
+            return
+        if await self._single_flight("prices", lambda: self._refresh(due)):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+    
+    async def _refresh_loop(self):
+        """
+        Every poll interval: renew the lease; the leader fetches the coins that are
+        due (backing off while the circuit is open), followers pick up new snapshots
+        """
+        while self.is_running:
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"Price refresher error: {e}")
+            await asyncio.sleep(self.poll_interval)
+    
+    def freshness(self) -> dict:
+        """When the served prices were fetched and whether they are overdue"""
+        if not self.last_fetch:
+            return {"updated_at": None, "age_seconds": None, "stale": True}
+        age = (datetime.now(timezone.utc) - self.last_fetch).total_seconds()
+        return {
+            "updated_at": self.last_fetch.isoformat(),
+            "age_seconds": round(age, 1),
+            "stale": age > self.refresh_interval * 2
+        }
+    
+    def _refresh_in_background(self):
+        self._start_flight("prices", self._refresh)
+    
     async def get_prices(self) -> List[dict]:
         """Get cryptocurrency prices with caching"""
-        now = datetime.utcnow()
+        # With the refresher running, requests only ever read memory
+        if self.is_running:
+            return self.formatted if self.cache else self._get_default_prices()
+        
+        now = datetime.now(timezone.utc)
         
         # Check if cache is valid
         if self.last_fetch and (now - self.last_fetch) < self.cache_duration and self.cache:
-            return self._format_prices(self.cache)
+            return self.formatted
         
-        # Fetch new prices
-        raw_prices = await self._fetch_prices()
+        # Stale-while-revalidate: serve the last good prices, refresh behind them
+        if self.cache:
+            self.stale_served += 1
+            self._refresh_in_background()
+            return self.formatted
         
+        # Nothing cached yet: wait for the (shared) fetch
+        raw_prices = await self._single_flight("prices", self._refresh)
         if raw_prices:
-            self.cache = raw_prices
-            self.last_fetch = now
-            return self._format_prices(raw_prices)
-        
-        # Return cached data if fetch failed
-        if self.cache:
-            return self._format_prices(self.cache)
+            return self.formatted
         
         # Return default data if no cache available
         return self._get_default_prices()
     
-    def _format_prices(self, raw_prices: Dict[str, dict]) -> List[dict]:
-        """Format prices for frontend consumption"""
-        formatted = []
+    async def get_payload(self) -> Tuple[bytes, str]:
+        """The prices as pre-encoded JSON bytes plus ETag"""
+        prices = await self.get_prices()
+        if prices is self.formatted and self.payload:
+            return self.payload
+        if self._default_payload is None:
+            self._default_payload = encode_prices(self._get_default_prices())
+        return self._default_payload
+    
+    def get_coin(self, symbol: str) -> Optional[dict]:
+        """One coin's formatted price and its own freshness, without formatting the list"""
+        coin_id = self._by_symbol.get(symbol.upper())
+        if coin_id is None or coin_id not in self.cache:
+            return None
+        coin = self._format_coin(coin_id, self.coins[coin_id]["symbol"], self.cache[coin_id])
+        fetched_at = self.coin_fetched_at.get(coin_id)
+        coin["updated_at"] = datetime.fromtimestamp(fetched_at, timezone.utc).isoformat() if fetched_at else None
+        return coin
+    
+    def tracks(self, symbol: str) -> bool:
+        return symbol.upper() in self._by_symbol
+    
+    def price_usd(self, symbol: str) -> Optional[float]:
+        """Cached USD price of a coin, or None if it is not tracked or not priced yet"""
+        coin_id = self._by_symbol.get(symbol.upper())
+        price = self.cache.get(coin_id, {}).get('usd') if coin_id else None
+        return price or None
+    
+    def valuation(self, amounts_usd: Dict[str, float], symbols=VALUATION_SYMBOLS) -> dict:
+        """
+        Value USD amounts in crypto using the cached snapshot (never fetches).
+        A symbol without a price is valued as None.
+        """
+        prices = {symbol.upper(): self.price_usd(symbol) for symbol in symbols}
         
-        for coin_id, symbol in self.SUPPORTED_COINS.items():
-            if coin_id in raw_prices:
-                price_data = raw_prices[coin_id]
-                price = price_data.get('usd', 0)
-                change_24h = price_data.get('usd_24h_change', 0)
-                
-                # Format price based on value
-                if price >= 1000:
-                    price_str = f"${price:,.0f}"
-                elif price >= 1:
-                    price_str = f"${price:,.2f}"
-                else:
-                    price_str = f"${price:.4f}"
-                
-                # Format change
-                change_str = f"{change_24h:+.2f}%"
-                
-                formatted.append({
-                    'name': symbol,
-                    'full_name': coin_id.replace('-', ' ').title(),
-                    'price': price_str,
-                    'price_raw': price,
-                    'change': change_str,
-                    'change_raw': change_24h,
-                    'positive': change_24h >= 0
-                })
+        def convert(usd: float) -> dict:
+            values = {"USD": round(usd, 2)}
+            for symbol, price in prices.items():
+                values[symbol] = round(usd / price, 8) if price else None
+            return values
+        
+        return {
+            "prices_usd": prices,
+            **self.freshness(),
+            "balances": {name: convert(amount) for name, amount in amounts_usd.items()},
+            "total": convert(sum(amounts_usd.values()))
+        }
+    
+    def _format_coin(self, coin_id: str, symbol: str, price_data: dict) -> dict:
+        price = price_data.get('usd', 0)
+        change_24h = price_data.get('usd_24h_change', 0) or 0
         
-        return formatted
+        # Format price based on value
+        if price >= 1000:
+            price_str = f"${price:,.0f}"
+        elif price >= 1:
+            price_str = f"${price:,.2f}"
+        else:
+            price_str = f"${price:.4f}"
+        
+        # Format change
+        change_str = f"{change_24h:+.2f}%"
+        
+        return {
+            'name': symbol,
+            'full_name': coin_id.replace('-', ' ').title(),
+            'price': price_str,
+            'price_raw': price,
+            'change': change_str,
+            'change_raw': change_24h,
+            'positive': change_24h >= 0
+        }
+    
+    def _format_prices(self, raw_prices: Dict[str, dict]) -> List[dict]:
+        """Format prices for frontend consumption"""
+        return [
+            self._format_coin(coin_id, coin["symbol"], raw_prices[coin_id])
+            for coin_id, coin in self.coins.items() if coin_id in raw_prices
+        ]
     
     def _get_default_prices(self) -> List[dict]:
         """Return default prices when API is unavailable"""
@@ -0,0 +1,107 @@
+"""
+Daily Rollup Service for MINEX GLOBAL Platform
+Maintains one document per day per metric (count + total amount)
+for time-series analytics without scanning raw collections
+"""
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+from derived_writes import best_effort
+
+logger = logging.getLogger(__name__)
+
+# metric -> (source collection, match, date field, amount field or None for counts only)
+METRIC_SOURCES = {
+    "deposits": ("deposits", {"status": "approved"}, "approved_at", "$amount"),
+    "withdrawals": ("withdrawals", {"status": "approved"}, "approved_at", "$amount"),
+    "roi_paid": ("roi_transactions", {}, "created_at", "$amount"),
+    "commissions": ("commissions", {}, "created_at", "$amount"),
+    "registrations": ("users", {}, "created_at", None),
+}
+
+METRICS = tuple(METRIC_SOURCES)
+
+
+def day_key(when=None) -> str:
+    """UTC calendar day (YYYY-MM-DD) for a datetime or ISO string"""
+    if when is None:
+        when = datetime.now(timezone.utc)
+    if isinstance(when, str):
+        return when[:10]
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc)
+    return when.strftime("%Y-%m-%d")
+
+
+class DailyRollupService:
+    def __init__(self):
+        self.db = None
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    async def record(self, metric: str, amount: float = 0.0, when=None):
+        """Add one event to the rollup for its day"""
+        if self.db is None:
+            return
+        if metric not in METRIC_SOURCES:
+            raise ValueError(f"Unknown rollup metric: {metric}")
+
+        with best_effort(f"record {metric} rollup"):
+            await self.db.daily_rollups.update_one(
+                {"date": day_key(when), "metric": metric},
+                {"$inc": {"count": 1, "total": amount}},
+                upsert=True
+            )
+
+    async def get_range(self, start: str, end: str, metrics: Optional[List[str]] = None) -> List[dict]:
+        """Return rollup documents for an inclusive date range in one indexed query"""
+        query = {"date": {"$gte": start, "$lte": end}}
+        if metrics:
+            query["metric"] = {"$in": metrics}
+        return await self.db.daily_rollups.find(
+            query, {"_id": 0}
+        ).sort([("date", 1), ("metric", 1)]).to_list(None)
+
+    async def backfill(self, metrics: Optional[List[str]] = None) -> dict:
+        """
+        Rebuild rollups from the source collections.
+        Days found in history are overwritten; events recorded while this runs may be lost,
+        so run it during quiet periods.
+        """
+        summary = {}
+        for metric in metrics or METRICS:
+            collection, match, date_field, amount_expr = METRIC_SOURCES[metric]
+            pipeline = [
+                {"$match": {**match, date_field: {"$type": "string"}}},
+                {"$group": {
+                    "_id": {"$substrCP": [f"${date_field}", 0, 10]},
+                    "count": {"$sum": 1},
+                    "total": {"$sum": amount_expr if amount_expr else 0}
+                }}
+            ]
+            days = await self.db[collection].aggregate(pipeline).to_list(None)
+
+            operations = [
+                UpdateOne(
+                    {"date": day["_id"], "metric": metric},
+                    {"$set": {"count": day["count"], "total": day["total"]}},
+                    upsert=True
+                )
+                for day in days
+            ]
+            if operations:
+                await self.db.daily_rollups.bulk_write(operations, ordered=False)
+
+            summary[metric] = len(days)
+            logger.info(f"Backfilled {len(days)} days of {metric} rollups")
+
+        return {"days_backfilled": summary}
+
+
+# Global instance
+daily_rollups = DailyRollupService()
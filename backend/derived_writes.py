@@ -0,0 +1,20 @@
+"""
+Derived Writes Helper for MINEX GLOBAL Platform
+platform_stats, daily_rollups and the ledger are derived from the source
+collections and can be rebuilt from them (verify(), recompute(), backfill()),
+so a failed write to any of them is logged instead of failing the deposit,
+withdrawal, ROI or commission that caused it
+"""
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def best_effort(action: str):
+    """Log and swallow any error raised while updating a derived collection"""
+    try:
+        yield
+    except Exception as e:
+        logger.error(f"Failed to {action}: {e}")
@@ -0,0 +1,244 @@
+"""
+Email Outbox for MINEX GLOBAL Platform
+Durable queue for outgoing email: producers insert into email_outbox and return
+immediately; a pool of async workers claims messages with a lease, delivers
+them, retries failures with exponential backoff and dead-letters the rest.
+Delivery is at-least-once: an attempt abandoned on timeout may still complete,
+so the delivery function receives the message_id to deduplicate retries.
+"""
+import os
+import uuid
+import random
+import socket
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentEmailError(Exception):
+    """Raised by a delivery function when retrying cannot help (e.g. invalid address)"""
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENDING = "sending"
+    DEAD = "dead"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class EmailOutbox:
+    def __init__(self):
+        self.db = None
+        self.workers = 4
+        self.max_attempts = 6
+        self.lease_seconds = 60.0
+        self.poll_seconds = 2.0
+        self.backoff_base = 30.0
+        self.backoff_max = 3600.0
+        self.is_running = False
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.send_timeout = self.lease_seconds / 2
+        self._deliver: Optional[Callable[..., Awaitable[None]]] = None
+        self._on_failure: Optional[Callable[..., Awaitable[None]]] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def set_db(self, db):
+        """
+        Set database reference and read EMAIL_WORKERS / EMAIL_MAX_ATTEMPTS /
+        EMAIL_LEASE_SECONDS / EMAIL_SEND_TIMEOUT_SECONDS
+        """
+        self.db = db
+        self.workers = int(os.environ.get("EMAIL_WORKERS", self.workers))
+        self.max_attempts = int(os.environ.get("EMAIL_MAX_ATTEMPTS", self.max_attempts))
+        self.lease_seconds = float(os.environ.get("EMAIL_LEASE_SECONDS", self.lease_seconds))
+        # A send must give up well before its lease lapses, or another worker sends it too
+        self.send_timeout = min(
+            float(os.environ.get("EMAIL_SEND_TIMEOUT_SECONDS", self.lease_seconds / 2)),
+            self.lease_seconds / 2
+        )
+
+    async def enqueue(self, to_email: str, subject: str, html_content: str, email_type: str = "general") -> str:
+        """Store a message for delivery and return its id"""
+        now = _now().isoformat()
+        message = {
+            "message_id": str(uuid.uuid4()),
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "email_type": email_type,
+            "status": OutboxStatus.PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "lease_until": None,
+            "lease_owner": None,
+            "last_error": None,
+            "created_at": now
+        }
+        await self.db.email_outbox.insert_one(message)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return message["message_id"]
+
+    async def _claim(self, worker: str) -> Optional[dict]:
+        """Lease the next due message, including ones whose previous lease expired"""
+        now = _now()
+        return await self.db.email_outbox.find_one_and_update(
+            {"$or": [
+                {"status": OutboxStatus.PENDING, "next_attempt_at": {"$lte": now.isoformat()}},
+                {"status": OutboxStatus.SENDING, "lease_until": {"$lt": now.isoformat()}}
+            ]},
+            {
+                "$set": {
+                    "status": OutboxStatus.SENDING,
+                    "lease_owner": worker,
+                    "lease_until": (now + timedelta(seconds=self.lease_seconds)).isoformat()
+                },
+                "$inc": {"attempts": 1}
+            },
+            projection={"_id": 0},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _process(self, worker: str, message: dict):
+        owned = {"message_id": message["message_id"], "lease_owner": worker}
+        try:
+            await asyncio.wait_for(
+                self._deliver(
+                    message["to_email"], message["subject"], message["html_content"], message["email_type"],
+                    message["message_id"]
+                ),
+                timeout=self.send_timeout
+            )
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"Delivery timed out after {self.send_timeout:g}s"
+            else:
+                error = str(e)[:500]
+            await self._record_failure(message, error)
+            if isinstance(e, PermanentEmailError) or message["attempts"] >= self.max_attempts:
+                await self.db.email_outbox.update_one(owned, {"$set": {
+                    "status": OutboxStatus.DEAD,
+                    "last_error": error,
+                    "lease_owner": None,
+                    "lease_until": None,
+                    "dead_at": _now().isoformat()
+                }})
+                self.dead += 1
+                logger.error(f"Email {message['message_id']} to {message['to_email']} dead-lettered after {message['attempts']} attempts: {error}")
+            else:
+                retry_at = _now() + timedelta(seconds=self._backoff(message["attempts"]))
+                await self.db.email_outbox.update_one(owned, {"$set": {
+                    "status": OutboxStatus.PENDING,
+                    "last_error": error,
+                    "lease_owner": None,
+                    "lease_until": None,
+                    "next_attempt_at": retry_at.isoformat()
+                }})
+                self.retried += 1
+                logger.warning(f"Email {message['message_id']} attempt {message['attempts']} failed, retrying at {retry_at.isoformat()}: {error}")
+            return
+
+        # Delivered messages leave the outbox; email_logs keeps the record
+        await self.db.email_outbox.delete_one(owned)
+        self.sent += 1
+
+    async def _record_failure(self, message: dict, error: str):
+        if self._on_failure is None:
+            return
+        try:
+            await self._on_failure(
+                message["to_email"], message["subject"], message["html_content"], message["email_type"], error
+            )
+        except Exception as e:
+            logger.error(f"Failed to record delivery failure of email {message['message_id']}: {e}")
+
+    async def _worker_loop(self, worker: str):
+        while self.is_running:
+            try:
+                message = await self._claim(worker)
+                if message:
+                    await self._process(worker, message)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker {worker} error: {e}")
+
+            # Idle: wait for a local enqueue or poll for messages from other processes / retries
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, deliver: Callable[..., Awaitable[None]], on_failure: Optional[Callable[..., Awaitable[None]]] = None):
+        """
+        Start the worker pool. `deliver(to_email, subject, html_content, email_type)` raises
+        on failure; `on_failure(to_email, subject, html_content, email_type, error)` is awaited
+        for every failed attempt.
+        """
+        if self.is_running:
+            return
+        self._deliver = deliver
+        self._on_failure = on_failure
+        self._wakeup = asyncio.Event()
+        self.is_running = True
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(f"{self.owner}:{i}"))
+            for i in range(self.workers)
+        ]
+        logger.info(f"Email outbox started with {self.workers} workers")
+
+    async def stop(self):
+        """Stop the workers; messages they held are picked up again once their lease expires"""
+        self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def retry_dead(self, message_id: Optional[str] = None) -> int:
+        """Move dead-lettered messages (one, or all) back to the queue"""
+        query = {"status": OutboxStatus.DEAD}
+        if message_id:
+            query["message_id"] = message_id
+        result = await self.db.email_outbox.update_many(query, {
+            "$set": {"status": OutboxStatus.PENDING, "attempts": 0, "next_attempt_at": _now().isoformat()},
+            "$unset": {"dead_at": ""}
+        })
+        if result.modified_count and self._wakeup is not None:
+            self._wakeup.set()
+        return result.modified_count
+
+    async def stats(self) -> dict:
+        counts = await self.db.email_outbox.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        return {
+            "queued": {c["_id"]: c["count"] for c in counts},
+            "workers": len(self._tasks),
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead_lettered": self.dead
+        }
+
+
+# Global instance
+email_outbox = EmailOutbox()
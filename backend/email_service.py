@@ -2,6 +2,7 @@
 Email Service for MINEX GLOBAL Platform
 Using Resend for transactional emails
 Falls back to database logging if Resend not configured
+Emails are queued in the outbox while its workers run, and delivered inline otherwise
 """
 import os
 import asyncio
@@ -10,6 +11,8 @@ from typing import Optional
 from datetime import datetime, timezone
 import uuid
 
+from email_outbox import email_outbox, PermanentEmailError
+
 logger = logging.getLogger(__name__)
 
 # Try to import Resend
@@ -79,11 +82,13 @@ class EmailService:
         </html>
         """
     
-    async def _log_email_to_db(self, to_email: str, subject: str, email_type: str, content_preview: str, status: str = "logged"):
+    async def _log_email_to_db(self, to_email: str, subject: str, email_type: str, content_preview: str, status: str = "logged",
+                               message_id: Optional[str] = None):
         """Log email to database for admin review"""
         if self.db is not None:
             email_log = {
                 "email_id": str(uuid.uuid4()),
+                "message_id": message_id,
                 "to_email": to_email,
                 "subject": subject,
                 "email_type": email_type,
@@ -93,37 +98,69 @@ class EmailService:
             }
             await self.db.email_logs.insert_one(email_log)
     
+    async def log_failure(self, to_email: str, subject: str, html_content: str, email_type: str, error: str):
+        """Record a failed delivery attempt in email_logs"""
+        await self._log_email_to_db(to_email, subject, email_type, html_content[:200], f"failed: {error[:100]}")
+    
     async def send_email(self, to_email: str, subject: str, html_content: str, email_type: str = "general") -> bool:
-        """Send an email via Resend or log to database"""
+        """Queue an email in the outbox (or deliver it inline when the outbox is not running)"""
         try:
-            if not self.is_configured:
-                await self._log_email_to_db(to_email, subject, email_type, html_content[:200], "logged")
-                logger.info(f"Email logged (Resend not configured): {subject} to {to_email}")
+            if email_outbox.is_running:
+                await email_outbox.enqueue(to_email, subject, html_content, email_type)
                 return True
-            
-            params = {
-                "from": self.sender_email,
-                "to": [to_email],
-                "subject": subject,
-                "html": html_content
-            }
-            
             try:
-                # Run sync SDK in thread to keep FastAPI non-blocking
-                email_response = await asyncio.to_thread(resend.Emails.send, params)
-                email_id = email_response.get("id") if isinstance(email_response, dict) else getattr(email_response, 'id', None)
-                logger.info(f"Email sent successfully: {subject} to {to_email}, id: {email_id}")
-                await self._log_email_to_db(to_email, subject, email_type, html_content[:200], "sent")
-                return True
-            except Exception as resend_error:
-                logger.warning(f"Resend send failed: {str(resend_error)} - falling back to DB logging")
-                await self._log_email_to_db(to_email, subject, email_type, html_content[:200], f"failed: {str(resend_error)[:100]}")
-                return False
-                
+                await self.deliver(to_email, subject, html_content, email_type)
+            except Exception as send_error:
+                await self.log_failure(to_email, subject, html_content, email_type, str(send_error))
+                raise
+            return True
         except Exception as e:
             logger.error(f"Failed to send email: {str(e)}")
             return False
     
+    async def deliver(self, to_email: str, subject: str, html_content: str, email_type: str = "general",
+                      message_id: Optional[str] = None):
+        """
+        Send an email via Resend or log it to the database; raises if Resend rejects it.
+        message_id (the outbox message) makes retries safe: it is skipped once logged
+        as sent, and Resend drops repeats of the same idempotency key.
+        """
+        if message_id and self.db is not None and await self.db.email_logs.find_one(
+            {"message_id": message_id, "status": "sent"}, {"_id": 0, "email_id": 1}
+        ):
+            logger.info(f"Email {message_id} already sent, not sending again")
+            return
+        
+        if not self.is_configured:
+            await self._log_email_to_db(to_email, subject, email_type, html_content[:200], "logged")
+            logger.info(f"Email logged (Resend not configured): {subject} to {to_email}")
+            return
+        
+        params = {
+            "from": self.sender_email,
+            "to": [to_email],
+            "subject": subject,
+            "html": html_content
+        }
+        
+        try:
+            # Run sync SDK in thread to keep FastAPI non-blocking
+            if message_id:
+                # An attempt abandoned on timeout may still complete; the key makes a retry a no-op
+                email_response = await asyncio.to_thread(resend.Emails.send, params, {"idempotency_key": message_id})
+            else:
+                email_response = await asyncio.to_thread(resend.Emails.send, params)
+        except Exception as resend_error:
+            # Client errors (bad address, validation) will fail the same way again; rate limits will not
+            code = getattr(resend_error, "code", None) or getattr(resend_error, "status_code", None)
+            if isinstance(code, int) and 400 <= code < 500 and code != 429:
+                raise PermanentEmailError(str(resend_error)) from resend_error
+            raise
+        
+        email_id = email_response.get("id") if isinstance(email_response, dict) else getattr(email_response, 'id', None)
+        logger.info(f"Email sent successfully: {subject} to {to_email}, id: {email_id}")
+        await self._log_email_to_db(to_email, subject, email_type, html_content[:200], "sent", message_id)
+    
     async def send_verification_code(self, to_email: str, code: str, user_name: str = "User") -> bool:
         """Send email verification code"""
         content = f"""
@@ -0,0 +1,74 @@
+"""
+Streaming Export Helpers for MINEX GLOBAL Platform
+Streams rows from a Motor cursor as CSV or NDJSON with constant memory
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows are flushed to the client in chunks of this many documents
+FLUSH_EVERY = 500
+
+# export name -> (collection, columns, sort field)
+EXPORTS = {
+    "deposits": ("deposits", [
+        "deposit_id", "user_id", "amount", "payment_method", "transaction_hash", "status",
+        "created_at", "approved_at", "approved_by", "rejection_reason"
+    ], "created_at"),
+    "withdrawals": ("withdrawals", [
+        "withdrawal_id", "user_id", "amount", "wallet_address", "status",
+        "created_at", "approved_at", "approved_by", "transaction_hash", "rejection_reason"
+    ], "created_at"),
+    "commissions": ("commissions", [
+        "commission_id", "user_id", "from_user_id", "from_user_name", "amount", "commission_type",
+        "level_depth", "percentage", "source_type", "source_id", "created_at"
+    ], "created_at"),
+    "roi": ("roi_transactions", [
+        "transaction_id", "user_id", "staking_id", "amount", "roi_percentage", "created_at"
+    ], "created_at"),
+    "transactions": ("ledger", [
+        "transaction_id", "user_id", "type", "amount", "status", "description", "created_at"
+    ], "created_at"),
+}
+
+
+def _cell(value):
+    value = getattr(value, "value", value)
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+async def stream_export(cursor, columns: List[str], fmt: str) -> AsyncIterator[bytes]:
+    """Encode documents from a cursor into CSV or NDJSON chunks as they arrive"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    pending = 0
+    async for doc in cursor:
+        if writer:
+            writer.writerow([_cell(doc.get(c)) for c in columns])
+        else:
+            buffer.write(json.dumps({c: getattr(doc.get(c), "value", doc.get(c)) for c in columns}, default=str))
+            buffer.write("\n")
+        pending += 1
+
+        if pending >= FLUSH_EVERY:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    remaining = buffer.getvalue()
+    if remaining:
+        yield remaining.encode("utf-8")
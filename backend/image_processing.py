@@ -0,0 +1,115 @@
+"""
+Image Processing Service for MINEX GLOBAL Platform
+Validates, normalizes and thumbnails uploaded images with Pillow in a
+process pool, keeping CPU-heavy decoding off the event loop
+"""
+import io
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Union
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (320, 320)
+
+# Refuse decompression bombs well before Pillow's own hard limit
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Longest side of a stored image (WebP itself is limited to 16383)
+MAX_NORMALIZED_SIDE = 8192
+
+WEBP_AVAILABLE = features.check("webp")
+
+THUMBNAIL_FORMAT = "WEBP" if WEBP_AVAILABLE else "JPEG"
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload cannot be decoded as a supported image"""
+
+
+def _encode(image: Image.Image, fmt: str, **options) -> bytes:
+    out = io.BytesIO()
+    image.save(out, format=fmt, **options)
+    return out.getvalue()
+
+
+def process_image(source: Union[bytes, str]) -> Tuple[bytes, bytes]:
+    """
+    Decode an upload (raw bytes or a file path), apply EXIF orientation, drop all
+    metadata and re-encode it. Returns (normalized image, thumbnail).
+    Runs inside worker processes.
+    """
+    def open_source():
+        return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+    try:
+        with open_source() as probe:
+            if probe.width * probe.height > MAX_IMAGE_PIXELS:
+                raise InvalidImageError("Image dimensions too large")
+            probe.verify()
+        image = open_source()
+        source_format = image.format
+        image.seek(0)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except InvalidImageError:
+        raise
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(f"Invalid image: {e}") from e
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+    if max(image.size) > MAX_NORMALIZED_SIDE:
+        image.thumbnail((MAX_NORMALIZED_SIDE, MAX_NORMALIZED_SIDE))
+
+    # Re-encoding without passing info/exif strips every metadata block. Lossless PNG
+    # can be many times larger than the upload, so non-JPEG sources become WebP (or
+    # JPEG on top of white when WebP is unavailable)
+    if WEBP_AVAILABLE and (has_alpha or source_format != "JPEG"):
+        normalized = _encode(image.convert("RGBA" if has_alpha else "RGB"), "WEBP", quality=90)
+    elif has_alpha:
+        rgba = image.convert("RGBA")
+        flattened = Image.new("RGB", image.size, "white")
+        flattened.paste(rgba, mask=rgba)
+        normalized = _encode(flattened, "JPEG", quality=90, optimize=True)
+    else:
+        normalized = _encode(image.convert("RGB"), "JPEG", quality=90, optimize=True)
+
+    thumb = image.convert("RGBA" if has_alpha and WEBP_AVAILABLE else "RGB")
+    thumb.thumbnail(THUMBNAIL_SIZE)
+    thumbnail = _encode(thumb, THUMBNAIL_FORMAT, quality=75)
+
+    return normalized, thumbnail
+
+
+class ImageProcessor:
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            workers = int(os.environ.get("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+            # Never fork the running server (event loop, Mongo client threads); start clean workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._executor
+
+    async def process(self, source: Union[bytes, str]) -> Tuple[bytes, bytes]:
+        """Normalize an image (bytes or a file path) and build its thumbnail in the process pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), process_image, source)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+image_processor = ImageProcessor()
@@ -0,0 +1,248 @@
+"""
+Index Registry for MINEX GLOBAL Platform
+Declares every index the application's query shapes rely on.
+Applied idempotently at startup, or from the command line:
+
+    python indexes.py ensure   # create missing indexes
+    python indexes.py report   # list missing, unused, undeclared and mismatched indexes
+"""
+import asyncio
+import logging
+import os
+import sys
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _index(keys, **options) -> IndexModel:
+    if isinstance(keys, str):
+        keys = [(keys, ASC)]
+    return IndexModel(keys, **options)
+
+
+# collection -> indexes its query shapes need
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _index("user_id", unique=True),
+        _index("email", unique=True),
+        _index("referral_code", unique=True),
+        _index("referred_by"),
+        _index([("created_at", DESC), ("user_id", DESC)]),
+    ],
+    "deposits": [
+        _index("deposit_id", unique=True),
+        _index([("user_id", ASC), ("created_at", DESC), ("deposit_id", DESC)]),
+        _index([("user_id", ASC), ("status", ASC)]),
+        _index([("status", ASC), ("created_at", DESC), ("deposit_id", DESC)]),
+        _index([("created_at", DESC), ("deposit_id", DESC)]),
+    ],
+    "withdrawals": [
+        _index("withdrawal_id", unique=True),
+        _index([("user_id", ASC), ("created_at", DESC), ("withdrawal_id", DESC)]),
+        _index([("user_id", ASC), ("status", ASC)]),
+        _index([("status", ASC), ("created_at", DESC), ("withdrawal_id", DESC)]),
+        _index([("created_at", DESC), ("withdrawal_id", DESC)]),
+    ],
+    "staking": [
+        _index("staking_id"),
+        _index([("user_id", ASC), ("status", ASC)]),
+        _index([("user_id", ASC), ("start_date", DESC)]),
+        _index("status"),
+    ],
+    "commissions": [
+        _index("commission_id", unique=True),
+        _index([("user_id", ASC), ("created_at", DESC)]),
+        _index("created_at"),
+    ],
+    "roi_transactions": [
+        _index("transaction_id", unique=True),
+        _index([("user_id", ASC), ("created_at", DESC)]),
+        _index("created_at"),
+    ],
+    "investment_packages": [
+        _index("package_id", unique=True),
+        _index([("is_active", ASC), ("level", ASC)]),
+        _index("level"),
+    ],
+    "membership_packages": [
+        _index("package_id"),
+        _index([("is_active", ASC), ("level", ASC)]),
+    ],
+    "staking_packages": [
+        _index("staking_id"),
+        _index([("is_active", ASC), ("tier", ASC)]),
+    ],
+    "email_verifications": [
+        _index([("email", ASC), ("code", ASC), ("is_used", ASC)]),
+        _index([("email", ASC), ("is_used", ASC)]),
+    ],
+    "password_resets": [
+        _index([("email", ASC), ("code", ASC), ("is_used", ASC)]),
+    ],
+    "email_logs": [
+        _index([("created_at", DESC), ("email_id", DESC)]),
+        _index("message_id"),
+    ],
+    "email_outbox": [
+        _index("message_id", unique=True),
+        _index([("status", ASC), ("next_attempt_at", ASC)]),
+        _index([("status", ASC), ("lease_until", ASC)]),
+        _index([("status", ASC), ("created_at", DESC), ("message_id", DESC)]),
+    ],
+    "system_logs": [
+        _index([("run_time", DESC), ("log_id", DESC)]),
+    ],
+    "admin_settings": [
+        _index("settings_id", unique=True),
+    ],
+    "platform_stats": [
+        _index("stats_id", unique=True),
+    ],
+    "daily_rollups": [
+        _index([("date", ASC), ("metric", ASC)], unique=True),
+    ],
+    "blobs": [
+        _index("sha256", unique=True),
+    ],
+    "crypto_snapshots": [
+        _index("snapshot_id", unique=True),
+    ],
+    # TTLs match the retention in price_history.RESOLUTIONS
+    "price_history_1m": [
+        _index([("symbol", ASC), ("ts", ASC)], unique=True),
+        _index("ts", expireAfterSeconds=172800),
+    ],
+    "price_history_15m": [
+        _index([("symbol", ASC), ("ts", ASC)], unique=True),
+        _index("ts", expireAfterSeconds=1209600),
+    ],
+    "price_history_1h": [
+        _index([("symbol", ASC), ("ts", ASC)], unique=True),
+        _index("ts", expireAfterSeconds=7776000),
+    ],
+    "price_history_1d": [
+        _index([("symbol", ASC), ("ts", ASC)], unique=True),
+    ],
+    "ledger": [
+        _index("transaction_id", unique=True),
+        _index([("user_id", ASC), ("created_at", DESC), ("transaction_id", DESC)]),
+        _index([("user_id", ASC), ("type", ASC), ("created_at", DESC), ("transaction_id", DESC)]),
+    ],
+}
+
+
+# Index options that change behaviour; an index with the right keys but other options does not count
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _key_of(keys) -> Tuple:
+    """Normalize an index key spec for comparison"""
+    return tuple((field, int(direction)) for field, direction in keys)
+
+
+def _options_of(spec: dict) -> dict:
+    """Behavioural options of a declared index document or an index_information() entry"""
+    options = {option: spec[option] for option in COMPARED_OPTIONS if spec.get(option) not in (None, False)}
+    if "expireAfterSeconds" in options:
+        options["expireAfterSeconds"] = int(options["expireAfterSeconds"])
+    return options
+
+
+def _mismatch(collection: str, model: IndexModel, info: dict) -> str:
+    return (
+        f"{collection}.{model.document['name']}: declared {_options_of(model.document)}, "
+        f"found {_options_of(info)}"
+    )
+
+
+async def ensure_indexes(db) -> dict:
+    """
+    Create every declared index that does not exist yet.
+    A failing index (e.g. duplicates blocking a unique index) is logged and
+    reported without stopping the others.
+    """
+    created, failed, mismatched = [], {}, []
+    for collection, models in INDEXES.items():
+        existing = {_key_of(info["key"]): info for info in (await db[collection].index_information()).values()}
+        for model in models:
+            info = existing.get(_key_of(model.document["key"].items()))
+            if info is not None:
+                # Never drop it automatically: it may be what keeps a unique index from building
+                if _options_of(info) != _options_of(model.document):
+                    mismatched.append(_mismatch(collection, model, info))
+                    logger.error(f"Index options differ from the declaration: {mismatched[-1]}")
+                continue
+            name = f"{collection}.{model.document['name']}"
+            try:
+                await db[collection].create_indexes([model])
+                created.append(name)
+            except OperationFailure as e:
+                failed[name] = str(e)
+                logger.error(f"Failed to create index {name}: {e}")
+
+    if created:
+        logger.info(f"Created {len(created)} indexes: {', '.join(created)}")
+    return {"created": created, "failed": failed, "mismatched": mismatched}
+
+
+async def report_indexes(db) -> dict:
+    """List declared-but-missing, declared-but-unused, undeclared and option-mismatched indexes"""
+    missing, unused, undeclared, mismatched = [], [], [], []
+    for collection in sorted(set(INDEXES) | set(await db.list_collection_names())):
+        declared = {_key_of(m.document["key"].items()): m for m in INDEXES.get(collection, [])}
+        info = await db[collection].index_information()
+        present = {_key_of(i["key"]): (name, i) for name, i in info.items() if name != "_id_"}
+
+        missing += [f"{collection}.{m.document['name']}" for key, m in declared.items() if key not in present]
+        undeclared += [f"{collection}.{name}" for key, (name, _) in present.items() if key not in declared]
+        mismatched += [
+            _mismatch(collection, m, present[key][1]) for key, m in declared.items()
+            if key in present and _options_of(present[key][1]) != _options_of(m.document)
+        ]
+
+        try:
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        except OperationFailure:
+            stats = []
+        unused += [
+            f"{collection}.{s['name']}" for s in stats
+            if s["name"] != "_id_" and s.get("accesses", {}).get("ops", 0) == 0
+        ]
+
+    return {"missing": missing, "unused": unused, "undeclared": undeclared, "mismatched": mismatched}
+
+
+async def _main(command: str):
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if command == "ensure":
+            result = await ensure_indexes(db)
+        else:
+            result = await report_indexes(db)
+    finally:
+        client.close()
+
+    for section, items in result.items():
+        print(f"{section}: {len(items)}")
+        for item in items:
+            print(f"  {item}" if isinstance(items, list) else f"  {item}: {items[item]}")
+    return 1 if result.get("failed") or result.get("missing") or result.get("mismatched") else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    if command not in ("ensure", "report"):
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(asyncio.run(_main(command)))
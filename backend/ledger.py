@@ -0,0 +1,147 @@
+"""
+Transaction Ledger Service for MINEX GLOBAL Platform
+Single append-only collection of every money movement per user,
+so transaction history is one indexed, paginated query
+"""
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from derived_writes import best_effort
+
+logger = logging.getLogger(__name__)
+
+LEDGER_TYPES = ("deposit", "withdrawal", "roi", "commission")
+
+
+def _value(v):
+    """Unwrap enums so ledger documents only hold plain strings"""
+    return getattr(v, "value", v)
+
+
+def deposit_entry(d: dict) -> dict:
+    return {
+        "transaction_id": d["deposit_id"],
+        "user_id": d["user_id"],
+        "type": "deposit",
+        "amount": d["amount"],
+        "status": _value(d["status"]),
+        "description": f"Deposit via {_value(d.get('payment_method')) or 'USDT'}",
+        "created_at": d["created_at"],
+        "metadata": {"payment_method": _value(d.get("payment_method"))}
+    }
+
+
+def withdrawal_entry(w: dict) -> dict:
+    return {
+        "transaction_id": w["withdrawal_id"],
+        "user_id": w["user_id"],
+        "type": "withdrawal",
+        "amount": -w["amount"],
+        "status": _value(w["status"]),
+        "description": f"Withdrawal to {w.get('wallet_address', '')[:10]}...",
+        "created_at": w["created_at"],
+        "metadata": {"wallet_address": w.get("wallet_address")}
+    }
+
+
+def roi_entry(r: dict) -> dict:
+    return {
+        "transaction_id": r["transaction_id"],
+        "user_id": r["user_id"],
+        "type": "roi",
+        "amount": r["amount"],
+        "status": "completed",
+        "description": f"Daily ROI ({r.get('roi_percentage', 0)}%)",
+        "created_at": r["created_at"],
+        "metadata": {"roi_percentage": r.get("roi_percentage")}
+    }
+
+
+def commission_entry(c: dict) -> dict:
+    level_name = c.get("commission_type", "LEVEL_1").replace("_", " ")
+    return {
+        "transaction_id": c["commission_id"],
+        "user_id": c["user_id"],
+        "type": "commission",
+        "amount": c["amount"],
+        "status": "completed",
+        "description": f"{level_name} Commission ({c.get('percentage', 0)}%) from {c.get('from_user_name', 'team member')}",
+        "created_at": c["created_at"],
+        "metadata": {
+            "from_user": c.get("from_user_name"),
+            "level": c.get("level_depth"),
+            "percentage": c.get("percentage")
+        }
+    }
+
+
+# source collection -> builder used for backfill
+LEDGER_SOURCES = {
+    "deposits": deposit_entry,
+    "withdrawals": withdrawal_entry,
+    "roi_transactions": roi_entry,
+    "commissions": commission_entry,
+}
+
+
+class LedgerService:
+    def __init__(self):
+        self.db = None
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    async def append(self, entry: dict):
+        """Append an entry; replays of the same source document are ignored"""
+        if self.db is None:
+            return
+        with best_effort(f"append ledger entry {entry.get('transaction_id')}"):
+            try:
+                await self.db.ledger.insert_one(dict(entry))
+            except DuplicateKeyError:
+                logger.info(f"Ledger entry already recorded: {entry['transaction_id']}")
+
+    async def set_status(self, transaction_id: str, status):
+        """
+        Mirror a deposit/withdrawal status change.
+        Amounts and timestamps of ledger entries are never rewritten.
+        """
+        if self.db is None:
+            return
+        with best_effort(f"update ledger status for {transaction_id}"):
+            await self.db.ledger.update_one(
+                {"transaction_id": transaction_id},
+                {"$set": {"status": _value(status)}}
+            )
+
+    async def backfill(self, batch_size: int = 1000) -> dict:
+        """Populate the ledger from the source collections (idempotent)"""
+        summary = {}
+        for collection, build in LEDGER_SOURCES.items():
+            written = 0
+            operations = []
+            async for doc in self.db[collection].find({}, {"_id": 0}):
+                entry = build(doc)
+                status = entry.pop("status")
+                operations.append(UpdateOne(
+                    {"transaction_id": entry["transaction_id"]},
+                    {"$setOnInsert": entry, "$set": {"status": status}},
+                    upsert=True
+                ))
+                if len(operations) >= batch_size:
+                    await self.db.ledger.bulk_write(operations, ordered=False)
+                    written += len(operations)
+                    operations = []
+            if operations:
+                await self.db.ledger.bulk_write(operations, ordered=False)
+                written += len(operations)
+            summary[collection] = written
+            logger.info(f"Ledger backfill: {written} entries from {collection}")
+        return {"entries_backfilled": summary}
+
+
+# Global instance
+ledger = LedgerService()
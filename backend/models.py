@@ -207,6 +207,9 @@ class Deposit(BaseModel):
     payment_method: PaymentMethod
     transaction_hash: Optional[str] = None
     screenshot_url: Optional[str] = None
+    screenshot_blob: Optional[str] = None  # SHA-256 of the screenshot in the blob store
+    screenshot_thumbnail_url: Optional[str] = None
+    screenshot_thumb_blob: Optional[str] = None
     status: DepositStatus = DepositStatus.PENDING
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     approved_at: Optional[datetime] = None
@@ -288,12 +291,17 @@ class ROITransaction(BaseModel):
     roi_percentage: float
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class CryptoCoin(BaseModel):
+    id: str = Field(pattern=r"^[a-z0-9-]+$")  # CoinGecko coin id
+    symbol: str = Field(min_length=1, max_length=12)
+    refresh_seconds: Optional[int] = Field(default=None, ge=10)  # None follows the global refresh interval
+
 class AdminSettings(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
     settings_id: str = "default"
     usdt_wallet_address: str = ""
-    qr_code_image: Optional[str] = None  # Base64 encoded QR code
+    qr_code_image: Optional[str] = None  # URL of the current QR code version
     withdrawal_dates: List[int] = Field(default_factory=lambda: [1, 15])  # Days of month when withdrawal allowed
     community_star_target: float = 28.0
     community_star_bonus_min: float = 100.0
@@ -0,0 +1,79 @@
+"""
+Keyset Pagination Helpers for MINEX GLOBAL Platform
+Cursor-based paging over (sort field, id field) so pages stay stable
+while new documents are being inserted
+"""
+import base64
+import json
+from typing import Optional, Tuple, List
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(sort_value, id_value: str) -> str:
+    """Encode the last row's sort key into an opaque URL-safe token"""
+    raw = json.dumps([sort_value, id_value], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, str]:
+    """Decode a token produced by encode_cursor"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        sort_value, id_value = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+    # Only plain scalars may reach the query - never operator documents
+    if not isinstance(sort_value, (str, int, float)) or not isinstance(id_value, str):
+        raise InvalidCursorError("Invalid pagination cursor")
+    return sort_value, id_value
+
+
+def keyset_filter(query: dict, cursor: Optional[str], sort_field: str, id_field: str) -> dict:
+    """Restrict a query to rows strictly after the cursor in (sort_field, id_field) descending order"""
+    if not cursor:
+        return query
+
+    sort_value, id_value = decode_cursor(cursor)
+    after_cursor = {"$or": [
+        {sort_field: {"$lt": sort_value}},
+        {sort_field: sort_value, id_field: {"$lt": id_value}}
+    ]}
+    if not query:
+        return after_cursor
+    return {"$and": [query, after_cursor]}
+
+
+async def paginate(
+    collection,
+    query: dict,
+    projection: dict,
+    sort_field: str,
+    id_field: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fetch one page of documents newest-first.
+    Returns the page and the cursor for the next page (None on the last page).
+    The projection must include sort_field and id_field.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # Fetch one extra row to know whether another page exists
+    docs = await collection.find(
+        keyset_filter(query, cursor, sort_field, id_field), projection
+    ).sort([(sort_field, -1), (id_field, -1)]).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last.get(id_field))
+
+    return docs, next_cursor
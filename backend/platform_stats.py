@@ -0,0 +1,137 @@
+"""
+Platform Stats Service for MINEX GLOBAL Platform
+Keeps running totals of platform-wide financial metrics in a single
+document so the admin dashboard never has to scan transaction history
+"""
+import logging
+import asyncio
+from datetime import datetime, timezone
+
+from derived_writes import best_effort
+
+logger = logging.getLogger(__name__)
+
+STATS_ID = "platform"
+
+# Counter fields maintained with $inc by every money-moving path
+COUNTER_FIELDS = (
+    "total_deposits",
+    "total_withdrawals",
+    "total_commissions_paid",
+    "total_roi_paid",
+    "active_stakes_count",
+    "active_stakes_volume",
+)
+
+
+async def sum_amount(collection, match: dict) -> float:
+    """Sum the amount field of matching documents server-side"""
+    result = await collection.aggregate([
+        {"$match": match},
+        {"$project": {"_id": 0, "amount": 1}},
+        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+    ]).to_list(1)
+    return result[0]["total"] if result else 0.0
+
+
+class PlatformStatsService:
+    def __init__(self):
+        self.db = None
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    async def increment(self, **deltas):
+        """Atomically apply deltas to the running totals"""
+        if self.db is None:
+            return
+        unknown = set(deltas) - set(COUNTER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown platform stats fields: {', '.join(sorted(unknown))}")
+
+        with best_effort(f"update platform stats {deltas}"):
+            await self.db.platform_stats.update_one(
+                {"stats_id": STATS_ID},
+                {"$inc": deltas, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+                upsert=True
+            )
+
+    async def get(self) -> dict:
+        """Read the running totals"""
+        stats = await self.db.platform_stats.find_one({"stats_id": STATS_ID}, {"_id": 0})
+        if not stats:
+            stats = await self.recompute()
+        return stats
+
+    async def _compute_from_sources(self) -> dict:
+        """Recompute every counter from the source collections"""
+        (
+            total_deposits,
+            total_withdrawals,
+            total_commissions_paid,
+            total_roi_paid,
+            active_stakes_count,
+            active_stakes_volume
+        ) = await asyncio.gather(
+            sum_amount(self.db.deposits, {"status": "approved"}),
+            sum_amount(self.db.withdrawals, {"status": "approved"}),
+            sum_amount(self.db.commissions, {}),
+            sum_amount(self.db.roi_transactions, {}),
+            self.db.staking.count_documents({"status": "active"}),
+            sum_amount(self.db.staking, {"status": "active"})
+        )
+        return {
+            "total_deposits": total_deposits,
+            "total_withdrawals": total_withdrawals,
+            "total_commissions_paid": total_commissions_paid,
+            "total_roi_paid": total_roi_paid,
+            "active_stakes_count": active_stakes_count,
+            "active_stakes_volume": active_stakes_volume,
+        }
+
+    async def recompute(self) -> dict:
+        """Rebuild the stats document from the source collections"""
+        computed = await self._compute_from_sources()
+        stats = {
+            "stats_id": STATS_ID,
+            **computed,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "verified_at": datetime.now(timezone.utc).isoformat()
+        }
+        await self.db.platform_stats.update_one({"stats_id": STATS_ID}, {"$set": stats}, upsert=True)
+        return stats
+
+    async def verify(self, fix: bool = True) -> dict:
+        """
+        Compare the running totals against the source collections.
+        Returns the drift per field; rewrites the document when fix is True.
+        Writes landing while the recompute runs can cause a small transient drift.
+        """
+        current = await self.db.platform_stats.find_one({"stats_id": STATS_ID}, {"_id": 0}) or {}
+        computed = await self._compute_from_sources()
+
+        drift = {
+            field: computed[field] - current.get(field, 0)
+            for field in COUNTER_FIELDS
+            if abs(computed[field] - current.get(field, 0)) > 1e-6
+        }
+        if drift:
+            logger.warning(f"Platform stats drift detected: {drift}")
+
+        if fix:
+            await self.db.platform_stats.update_one(
+                {"stats_id": STATS_ID},
+                {"$set": {
+                    **computed,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                    "verified_at": datetime.now(timezone.utc).isoformat()
+                }},
+                upsert=True
+            )
+
+        return {"consistent": not drift, "drift": drift, "fixed": fix and bool(drift), "stats": computed}
+
+
+# Global instance
+platform_stats = PlatformStatsService()
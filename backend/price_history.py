@@ -0,0 +1,207 @@
+"""
+Price History Service for MINEX GLOBAL Platform
+Keeps a per-coin OHLC history at 1m, 15m, 1h and 1d resolution. Every price
+refresh is folded into the current bucket of each resolution; buckets are
+upserted on (symbol, ts) into a MongoDB collection per resolution when they
+complete, and open buckets are saved on shutdown and leader changes. The most
+recent buckets stay in in-memory ring buffers that serve chart requests.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+class Resolution(NamedTuple):
+    name: str
+    seconds: int
+    points: int  # Buckets kept in memory
+    expire_seconds: Optional[int]  # Retention in MongoDB; None keeps forever
+
+
+RESOLUTIONS = {
+    r.name: r for r in (
+        Resolution("1m", 60, 1440, 2 * 86400),
+        Resolution("15m", 900, 672, 14 * 86400),
+        Resolution("1h", 3600, 720, 90 * 86400),
+        Resolution("1d", 86400, 730, None),
+    )
+}
+
+# Chart range -> (resolution, seconds covered)
+RANGES = {
+    "1h": ("1m", 3600),
+    "1d": ("15m", 86400),
+    "7d": ("1h", 7 * 86400),
+    "30d": ("1h", 30 * 86400),
+    "1y": ("1d", 365 * 86400),
+}
+
+
+def collection_name(resolution: str) -> str:
+    return f"price_history_{resolution}"
+
+
+class PriceHistoryService:
+    def __init__(self):
+        self.db = None
+        # resolution -> symbol -> ring buffer of [bucket_ts, open, high, low, close];
+        # the last bucket is still open
+        self._series: Dict[str, Dict[str, Deque[list]]] = {name: {} for name in RESOLUTIONS}
+        self._pending: set = set()
+
+    def set_db(self, db):
+        """Set database reference"""
+        self.db = db
+
+    async def ensure_collections(self):
+        """
+        Convert collections from the time-series layout, or plain ones without a
+        unique (symbol, ts) index, into plain collections keyed by (symbol, ts),
+        keeping the last record written for each bucket. Time-series collections
+        cannot be upserted into, and a rewritten bucket must replace its record.
+        Must run before the index registry is applied.
+        """
+        timeseries = set(await self.db.list_collection_names(filter={"type": "timeseries"}))
+        existing = set(await self.db.list_collection_names())
+        for resolution in RESOLUTIONS.values():
+            name = collection_name(resolution.name)
+            if name not in existing:
+                continue
+            if name not in timeseries and await self._has_bucket_key(name):
+                continue
+            try:
+                await self._rebuild(name)
+            except OperationFailure as e:
+                logger.error(f"Failed to rebuild {name}: {e}")
+
+    async def _has_bucket_key(self, name: str) -> bool:
+        info = await self.db[name].index_information()
+        return any(i["key"] == [("symbol", ASCENDING), ("ts", ASCENDING)] and i.get("unique") for i in info.values())
+
+    async def _rebuild(self, name: str):
+        staging = f"{name}_rebuild"
+        await self.db[staging].drop()
+        await self.db[staging].create_index([("symbol", ASCENDING), ("ts", ASCENDING)], unique=True)
+        await self.db[name].aggregate([
+            {"$sort": {"_id": 1}},
+            {"$group": {
+                "_id": {"symbol": "$symbol", "ts": "$ts"},
+                **{field: {"$last": f"${field}"} for field in ("o", "h", "l", "c")}
+            }},
+            {"$project": {"_id": 0, "symbol": "$_id.symbol", "ts": "$_id.ts", "o": 1, "h": 1, "l": 1, "c": 1}},
+            {"$merge": {"into": staging, "on": ["symbol", "ts"], "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ]).to_list(None)
+        await self.db[name].drop()
+        await self.db[staging].rename(name)
+        logger.info(f"Rebuilt {name} with one record per (symbol, ts)")
+
+    async def load(self):
+        """Fill the in-memory ring buffers from MongoDB (warm start)"""
+        now = time.time()
+        for resolution in RESOLUTIONS.values():
+            since = datetime.fromtimestamp(now - resolution.points * resolution.seconds, timezone.utc)
+            series = self._series[resolution.name]
+            cursor = self.db[collection_name(resolution.name)].find({"ts": {"$gte": since}}, {"_id": 0}).sort("ts", 1)
+            async for doc in cursor:
+                bucket = int(doc["ts"].replace(tzinfo=timezone.utc).timestamp())
+                buffer = series.setdefault(doc["symbol"], deque(maxlen=resolution.points))
+                buffer.append([bucket, doc["o"], doc["h"], doc["l"], doc["c"]])
+
+    def record(self, prices: List[dict], at: Optional[float] = None, persist: bool = True):
+        """
+        Fold one price snapshot (the formatted price list) into every resolution.
+        Every worker records into memory; only one should persist completed buckets.
+        """
+        at = at if at is not None else time.time()
+        completed: Dict[str, List[dict]] = {}
+        for item in prices:
+            price = item.get("price_raw")
+            if price is None:
+                continue
+            for resolution in RESOLUTIONS.values():
+                bucket = int(at) - int(at) % resolution.seconds
+                buffer = self._series[resolution.name].setdefault(item["name"], deque(maxlen=resolution.points))
+                current = buffer[-1] if buffer else None
+                if current and current[0] == bucket:
+                    current[2] = max(current[2], price)
+                    current[3] = min(current[3], price)
+                    current[4] = price
+                    continue
+                if current and current[0] > bucket:
+                    continue  # Older than what we already have
+                if current:
+                    completed.setdefault(resolution.name, []).append(self._to_doc(item["name"], current))
+                buffer.append([bucket, price, price, price, price])
+
+        if completed and persist:
+            self._schedule(completed)
+
+    def save_open_buckets(self):
+        """Persist the bucket still open in every series (on shutdown or a leader change)"""
+        open_buckets = {
+            resolution: [self._to_doc(symbol, buffer[-1]) for symbol, buffer in series.items() if buffer]
+            for resolution, series in self._series.items()
+        }
+        self._schedule({resolution: docs for resolution, docs in open_buckets.items() if docs})
+
+    async def flush(self):
+        """Wait for scheduled writes to finish (called on app shutdown)"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def _schedule(self, buckets: Dict[str, List[dict]]):
+        if not buckets or self.db is None:
+            return
+        task = asyncio.create_task(self._persist(buckets))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    @staticmethod
+    def _to_doc(symbol: str, bucket: list) -> dict:
+        ts, o, h, l, c = bucket
+        return {"ts": datetime.fromtimestamp(ts, timezone.utc), "symbol": symbol, "o": o, "h": h, "l": l, "c": c}
+
+    async def _persist(self, buckets: Dict[str, List[dict]]):
+        # A bucket saved while open is replaced by its final values later
+        for resolution, docs in buckets.items():
+            requests = [ReplaceOne({"symbol": d["symbol"], "ts": d["ts"]}, d, upsert=True) for d in docs]
+            try:
+                await self.db[collection_name(resolution)].bulk_write(requests, ordered=False)
+            except Exception as e:
+                logger.error(f"Failed to persist {resolution} price history: {e}")
+
+    def get_series(self, symbol: str, range_name: str) -> Optional[dict]:
+        """
+        Chart-ready series for a coin and range from the pre-aggregated buckets:
+        points are [timestamp_ms, open, high, low, close], oldest first
+        """
+        resolution, span = RANGES[range_name]
+        buffer = self._series[resolution].get(symbol)
+        if buffer is None:
+            return None
+
+        since = time.time() - span
+        points = [[ts * 1000, o, h, l, c] for ts, o, h, l, c in buffer if ts >= since]
+        change = None
+        if points and points[0][1]:
+            change = round((points[-1][4] - points[0][1]) / points[0][1] * 100, 2)
+        return {
+            "symbol": symbol,
+            "range": range_name,
+            "resolution": resolution,
+            "columns": ["t", "o", "h", "l", "c"],
+            "points": points,
+            "change_pct": change
+        }
+
+
+# Global instance
+price_history = PriceHistoryService()
@@ -0,0 +1,100 @@
+"""
+Price Stream Service for MINEX GLOBAL Platform
+Fans crypto price updates out to Server-Sent Events clients from a single
+source: each update is serialized once and handed to every subscriber
+"""
+import os
+import json
+import asyncio
+import logging
+import weakref
+from typing import AsyncIterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15.0
+
+# Delay before browsers reconnect a dropped EventSource
+RECONNECT_MILLISECONDS = 5000
+
+
+class TooManySubscribersError(RuntimeError):
+    """Raised when the stream is at its connection limit"""
+
+
+def format_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class PriceBroadcaster:
+    def __init__(self, max_subscribers: int = 5000):
+        self.max_subscribers = max_subscribers
+        self.heartbeat_seconds = HEARTBEAT_SECONDS
+        self.latest: Optional[bytes] = None
+        self.published = 0
+        self.dropped = 0  # Updates replaced before a slow client read them
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def configure_from_env(self):
+        """Apply PRICE_STREAM_MAX_CLIENTS / PRICE_STREAM_HEARTBEAT_SECONDS"""
+        self.max_subscribers = int(os.environ.get("PRICE_STREAM_MAX_CLIENTS", self.max_subscribers))
+        self.heartbeat_seconds = float(os.environ.get("PRICE_STREAM_HEARTBEAT_SECONDS", self.heartbeat_seconds))
+
+    def publish(self, prices: List[dict]):
+        """
+        Push new prices to every subscriber. Each client queue holds at most one
+        pending update, so a slow client skips to the newest prices instead of
+        buffering without bound.
+        """
+        message = format_event("prices", prices)
+        self.latest = message
+        self.published += 1
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    def subscribe(self, is_disconnected) -> AsyncIterator[bytes]:
+        """
+        Yield SSE messages for one client: the current prices, then every update,
+        with a comment line as heartbeat when nothing was sent for a while
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            raise TooManySubscribersError("Too many price stream clients")
+
+        # Reserve the slot now so concurrent subscribers cannot overshoot the limit;
+        # the finalizer releases it if the stream is dropped without ever being started
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        stream = self._stream(queue, is_disconnected)
+        weakref.finalize(stream, self._subscribers.discard, queue)
+        return stream
+
+    async def _stream(self, queue: asyncio.Queue, is_disconnected) -> AsyncIterator[bytes]:
+        try:
+            yield f"retry: {RECONNECT_MILLISECONDS}\n\n".encode()
+            if self.latest:
+                yield self.latest
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    message = b": ping\n\n"
+                yield message
+        finally:
+            self._subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "published": self.published,
+            "dropped": self.dropped
+        }
+
+
+# Global instance
+price_broadcaster = PriceBroadcaster()
@@ -0,0 +1,194 @@
+"""
+Query Plan Regression Checker for MINEX GLOBAL Platform
+Captures the query shapes issued by API endpoints and the ROI scheduler,
+then explains each one to catch collection scans, in-memory sorts and
+poor docs-examined/returned ratios.
+
+Capture: start the server with QUERY_SHAPE_LOG=/path/shapes.jsonl, run the
+test suite or a benchmark against it, then stop it (shapes are written on shutdown).
+
+Check:   python query_plans.py /path/shapes.jsonl [--max-ratio 10] [--allow ORIGIN ...]
+         (uses MONGO_URL / DB_NAME; exits 1 when any shape regresses)
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from contextvars import ContextVar
+from typing import Dict, List
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Which endpoint or job issued the current query
+query_origin: ContextVar[str] = ContextVar("query_origin", default="unknown")
+
+CAPTURED_COMMANDS = ("find", "aggregate", "count", "distinct", "update", "delete", "findAndModify")
+
+
+def _shape(value):
+    """Replace literal values with placeholders so equal query shapes compare equal"""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        shaped = [_shape(v) for v in value]
+        return shaped if any(isinstance(v, (dict, list)) for v in shaped) else "?"
+    return "?"
+
+
+def _plain(value):
+    """Convert BSON containers into JSON-serializable values"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class QueryShapeRecorder(monitoring.CommandListener):
+    """Command listener that keeps one example command per (origin, query shape)"""
+
+    def __init__(self):
+        self.shapes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        name = event.command_name
+        if name not in CAPTURED_COMMANDS:
+            return
+        command = _plain(dict(event.command))
+        for key in ("lsid", "$db", "$clusterTime", "txnNumber", "$readPreference"):
+            command.pop(key, None)
+
+        collection = command.get(name)
+        shape_source = {k: v for k, v in command.items() if k in ("filter", "sort", "query", "pipeline", "updates", "deletes")}
+        key = json.dumps([query_origin.get(), name, collection, _shape(shape_source)], sort_keys=True)
+
+        with self._lock:
+            if key not in self.shapes:
+                self.shapes[key] = {
+                    "origin": query_origin.get(),
+                    "command": name,
+                    "collection": collection,
+                    "example": command,
+                }
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def dump(self, path: str):
+        with self._lock:
+            shapes = list(self.shapes.values())
+        with open(path, "w") as f:
+            for shape in shapes:
+                f.write(json.dumps(shape) + "\n")
+        logger.info(f"Wrote {len(shapes)} query shapes to {path}")
+
+
+def _explain_command(shape: dict) -> dict:
+    """Build the explainable form of a captured command"""
+    command = dict(shape["example"])
+    name = shape["command"]
+    if name in ("update", "delete"):
+        key = "updates" if name == "update" else "deletes"
+        command[key] = command.get(key, [])[:1]
+    if name == "aggregate":
+        # $out/$merge stages cannot be explained with executionStats
+        command["pipeline"] = [s for s in command.get("pipeline", []) if not ({"$out", "$merge"} & set(s))]
+    for key in ("cursor", "batchSize", "singleBatch", "writeConcern", "ordered"):
+        command.pop(key, None)
+    if name == "aggregate":
+        command["cursor"] = {}
+    return command
+
+
+def _walk(node, stages: List[str], stats: List[dict]):
+    if isinstance(node, dict):
+        if "stage" in node and isinstance(node["stage"], str):
+            stages.append(node["stage"])
+        if "executionStats" in node and isinstance(node["executionStats"], dict):
+            stats.append(node["executionStats"])
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            _walk(value, stages, stats)
+    elif isinstance(node, list):
+        for item in node:
+            _walk(item, stages, stats)
+
+
+def analyze_explain(explain: dict, max_ratio: float) -> List[str]:
+    """Return the problems found in an executionStats explain result"""
+    stages, stats = [], []
+    _walk(explain, stages, stats)
+
+    problems = []
+    if "COLLSCAN" in stages:
+        problems.append("collection scan")
+    if "SORT" in stages:
+        problems.append("in-memory sort")
+    for s in stats:
+        examined = s.get("totalDocsExamined", 0)
+        returned = max(s.get("nReturned", 0), 1)
+        if examined / returned > max_ratio:
+            problems.append(f"docs examined/returned {examined}/{s.get('nReturned', 0)}")
+            break
+    return problems
+
+
+def check_shapes(db, shapes: List[dict], max_ratio: float) -> List[dict]:
+    """Explain every captured shape and collect the ones with problems"""
+    failures = []
+    for shape in shapes:
+        try:
+            explain = db.command({"explain": _explain_command(shape), "verbosity": "executionStats"})
+        except Exception as e:
+            failures.append({**shape, "problems": [f"explain failed: {e}"]})
+            continue
+        problems = analyze_explain(explain, max_ratio)
+        if problems:
+            failures.append({**shape, "problems": problems})
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Explain captured query shapes and report regressions")
+    parser.add_argument("shapes", help="JSONL file written by QueryShapeRecorder")
+    parser.add_argument("--max-ratio", type=float, default=10.0, help="Max docs examined per doc returned")
+    parser.add_argument("--allow", action="append", default=[], help="Origin allowed to scan (e.g. intentional full-history jobs)")
+    args = parser.parse_args(argv)
+
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = MongoClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    with open(args.shapes) as f:
+        shapes = [json.loads(line) for line in f if line.strip()]
+    shapes = [s for s in shapes if s["origin"] not in args.allow]
+
+    try:
+        failures = check_shapes(db, shapes, args.max_ratio)
+    finally:
+        client.close()
+
+    for failure in failures:
+        print(f"[{failure['origin']}] {failure['command']} {failure['collection']}: {', '.join(failure['problems'])}")
+        print(f"    {json.dumps({k: v for k, v in failure['example'].items() if k != failure['command']})}")
+    print(f"{len(shapes)} query shapes checked, {len(failures)} with problems")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,12 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional
 import uuid
 
+from platform_stats import platform_stats
+from daily_rollups import daily_rollups
+from ledger import ledger, roi_entry, commission_entry
+from query_plans import query_origin
+from user_cache import user_cache
+
 logger = logging.getLogger(__name__)
 
 class ROIScheduler:
@@ -113,12 +119,16 @@ class ROIScheduler:
                     "created_at": datetime.now(timezone.utc).isoformat()
                 }
                 await self.db.commissions.insert_one(commission_doc)
+                await ledger.append(commission_entry(commission_doc))
                 
                 # Update upline balances
                 await self.db.users.update_one(
                     {"user_id": upline["user_id"]},
                     {"$inc": {"commission_balance": profit_share_amount, "wallet_balance": profit_share_amount}}
                 )
+                user_cache.invalidate(upline["user_id"])
+                await platform_stats.increment(total_commissions_paid=profit_share_amount)
+                await daily_rollups.record("commissions", profit_share_amount)
                 
                 # Send notification
                 if self.email_service:
@@ -151,6 +161,7 @@ class ROIScheduler:
             return {"error": "Database not configured"}
         
         logger.info("Starting automatic daily ROI distribution...")
+        query_origin.set("roi_scheduler.distribute_daily_roi")
         self.last_run = datetime.now(timezone.utc)
         
         # Get all active stakes
@@ -192,6 +203,8 @@ class ROIScheduler:
                                     {"user_id": user_id},
                                     {"$inc": {"wallet_balance": amount}}
                                 )
+                                user_cache.invalidate(user_id)
+                                await platform_stats.increment(active_stakes_count=-1, active_stakes_volume=-amount)
                                 completed_stakes += 1
                                 logger.info(f"Stake completed, capital returned: {stake_id}")
                             continue
@@ -213,6 +226,7 @@ class ROIScheduler:
                     "auto_distributed": True
                 }
                 await self.db.roi_transactions.insert_one(roi_doc)
+                await ledger.append(roi_entry(roi_doc))
                 
                 # Update user balances
                 await self.db.users.update_one(
@@ -225,6 +239,7 @@ class ROIScheduler:
                         "last_roi_date": datetime.now(timezone.utc).isoformat()
                     }}
                 )
+                user_cache.invalidate(user_id)
                 
                 # Update staking entry
                 await self.db.staking.update_one(
@@ -233,6 +248,9 @@ class ROIScheduler:
                      "$set": {"last_yield_date": datetime.now(timezone.utc).isoformat()}}
                 )
                 
+                await platform_stats.increment(total_roi_paid=roi_amount)
+                await daily_rollups.record("roi_paid", roi_amount)
+                
                 roi_count += 1
                 total_roi_distributed += roi_amount
                 
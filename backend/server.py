@@ -1,12 +1,14 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, UploadFile, File, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, UploadFile, File, BackgroundTasks, Request, Response, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 import random
 import string
+import time
 from pathlib import Path
 from typing import Optional, List
 import uuid
@@ -17,28 +19,65 @@ from models import (
     User, UserCreate, UserLogin, UserResponse, UserRole,
     MembershipPackage, StakingPackage, Deposit, DepositCreate, DepositStatus,
     Withdrawal, WithdrawalCreate, WithdrawalStatus, Staking, StakingCreate, StakingCreateLegacy, StakingStatus,
-    Commission, ROITransaction, AdminSettings, DashboardStats, AdminDashboardStats,
+    Commission, ROITransaction, AdminSettings, CryptoCoin, DashboardStats, AdminDashboardStats,
     PaymentMethod, InvestmentPackage, EmailVerificationRequest, EmailVerificationVerify,
     Transaction, TransactionType, PasswordChangeRequest, ForgotPasswordRequest, ResetPasswordRequest, VerifyResetCodeRequest
 )
-from auth import verify_password, get_password_hash, create_access_token, decode_access_token
+from auth import (
+    verify_password_async, get_password_hash_async, password_needs_rehash, shutdown_hash_executor,
+    create_access_token, decode_access_token, token_cache, configure_from_env as configure_auth_from_env,
+    sign, verify_signature
+)
 from email_service import email_service
+from email_outbox import email_outbox
 from crypto_service import crypto_service
+from price_history import price_history, RANGES as PRICE_HISTORY_RANGES
+from price_stream import price_broadcaster, TooManySubscribersError
 from roi_scheduler import roi_scheduler
+from platform_stats import platform_stats, sum_amount
+from ledger import ledger, deposit_entry, withdrawal_entry, commission_entry, LEDGER_TYPES
+from daily_rollups import daily_rollups, METRICS as ROLLUP_METRICS
+from exports import stream_export, EXPORTS, EXPORT_FORMATS
+from indexes import ensure_indexes
+from blob_store import blob_store, blob_url, BlobTooLargeError, UnsupportedBlobError
+from image_processing import image_processor, InvalidImageError
+from settings_cache import settings_cache
+from user_cache import user_cache, LEAN_USER_PROJECTION
+from query_plans import QueryShapeRecorder, query_origin
+from pagination import paginate, InvalidCursorError, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Optional query shape capture for the query plan regression checker
+query_shape_log = os.environ.get('QUERY_SHAPE_LOG')
+query_recorder = QueryShapeRecorder() if query_shape_log else None
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[query_recorder] if query_recorder else [])
 db = client[os.environ['DB_NAME']]
 
-# Set database reference for email service and ROI scheduler
+# Set database reference for email service, stats/rollups, ledger, blobs and ROI scheduler
+configure_auth_from_env()
+user_cache.configure_from_env()
 email_service.set_db(db)
+email_outbox.set_db(db)
+platform_stats.set_db(db)
+daily_rollups.set_db(db)
+ledger.set_db(db)
+blob_store.set_db(db)
+settings_cache.set_db(db)
+price_history.set_db(db)
+crypto_service.set_db(db)
 roi_scheduler.set_dependencies(db, email_service)
 
+async def tag_query_origin(request: Request):
+    """Attribute captured queries to the endpoint that issued them"""
+    route = request.scope.get("route")
+    query_origin.set(f"{request.method} {route.path if route else request.url.path}")
+
 app = FastAPI()
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", dependencies=[Depends(tag_query_origin)] if query_recorder else [])
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,9 +92,13 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> User:
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    user = await db.users.find_one({"user_id": payload.get("user_id")}, {"_id": 0})
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    user_id = payload.get("user_id")
+    user = user_cache.get(user_id) if user_id else None
+    if user is None:
+        user = await db.users.find_one({"user_id": user_id}, LEAN_USER_PROJECTION)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        user_cache.put(user_id, user)
     
     return User(**user)
 
@@ -64,6 +107,115 @@ async def get_admin_user(current_user: User = Depends(get_current_user)) -> User
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+async def get_page(response: Response, collection, query: dict, projection: dict, sort_field: str, id_field: str, limit: int, cursor: Optional[str]) -> List[dict]:
+    """Fetch one keyset page and expose the next cursor in the X-Next-Cursor header"""
+    try:
+        docs, next_cursor = await paginate(collection, query, projection, sort_field, id_field, limit, cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return docs
+
+def history_query(status: Optional[str] = None, user_id: Optional[str] = None) -> dict:
+    """Filters shared by the admin history lists and their exports, so both show the same rows"""
+    query = {}
+    if status:
+        query["status"] = status
+    if user_id:
+        query["user_id"] = user_id
+    return query
+
+def export_response(export_name: str, query: dict, fmt: str) -> StreamingResponse:
+    """Stream every matching row of an export newest first as CSV or NDJSON"""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
+    collection, columns, sort_field = EXPORTS[export_name]
+    projection = {"_id": 0, **{c: 1 for c in columns}}
+    cursor = db[collection].find(query, projection).sort(sort_field, -1).batch_size(1000)
+    
+    filename = f"{export_name}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        stream_export(cursor, columns, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header lists the ETag (weak or strong) or is *"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+# Signed blob links stay valid for one to two windows and are identical within a
+# window, so browsers can still cache the images they point to
+BLOB_LINK_WINDOW_SECONDS = 900
+
+def signed_blob_url(sha256: str) -> str:
+    """Short-lived link to a blob for <img> tags, which cannot send the bearer token"""
+    expires = (int(time.time()) // BLOB_LINK_WINDOW_SECONDS + 2) * BLOB_LINK_WINDOW_SECONDS
+    return f"{blob_url(sha256)}?expires={expires}&sig={sign(f'blob:{sha256}:{expires}')}"
+
+def with_signed_screenshot_urls(deposit: dict) -> dict:
+    """Replace the stored screenshot URLs of a deposit with signed links for the response"""
+    if deposit.get("screenshot_blob"):
+        deposit["screenshot_url"] = signed_blob_url(deposit["screenshot_blob"])
+    if deposit.get("screenshot_thumb_blob"):
+        deposit["screenshot_thumbnail_url"] = signed_blob_url(deposit["screenshot_thumb_blob"])
+    return deposit
+
+async def store_screenshot(source, owner_id: str) -> dict:
+    """
+    Normalize an image (bytes or a temp file path), store it with its thumbnail
+    readable by owner_id and return the deposit fields referencing both
+    """
+    try:
+        normalized, thumbnail = await image_processor.process(source)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        full = await blob_store.save_bytes(normalized, owner_id=owner_id)
+        thumb = await blob_store.save_bytes(thumbnail, owner_id=owner_id)
+    except BlobTooLargeError:
+        raise HTTPException(status_code=413, detail="Image too large after processing")
+    return {
+        "screenshot_blob": full["sha256"],
+        "screenshot_url": blob_url(full["sha256"]),
+        "screenshot_thumb_blob": thumb["sha256"],
+        "screenshot_thumbnail_url": blob_url(thumb["sha256"])
+    }
+
+async def store_screenshot_upload(file: UploadFile, owner_id: str) -> dict:
+    """Spool an uploaded screenshot to disk within the size limit and process it from there"""
+    try:
+        async with blob_store.spool_upload(file) as path:
+            return await store_screenshot(path, owner_id)
+    except BlobTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File too large (max {blob_store.max_upload_bytes // (1024 * 1024)} MB)")
+
+async def store_image_upload(file: UploadFile) -> dict:
+    """Store an uploaded image as-is, mapping size and type errors to HTTP errors"""
+    try:
+        return await blob_store.save_upload(file)
+    except BlobTooLargeError:
+        raise HTTPException(status_code=413, detail=f"File too large (max {blob_store.max_upload_bytes // (1024 * 1024)} MB)")
+    except UnsupportedBlobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def store_screenshot_data_url(data_url: str, owner_id: str) -> dict:
+    """Move a base64 data URL screenshot into the blob store"""
+    try:
+        data = base64.b64decode(data_url.split(",", 1)[1])
+    except (IndexError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    if len(data) > blob_store.max_upload_bytes:
+        raise HTTPException(status_code=413, detail="Image too large")
+    return await store_screenshot(data, owner_id)
+
 def generate_referral_code() -> str:
     return str(uuid.uuid4())[:8].upper()
 
@@ -226,12 +378,16 @@ async def distribute_commissions(staking_entry_id: str, user_id: str, amount: fl
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         await db.commissions.insert_one(commission_doc)
+        await ledger.append(commission_entry(commission_doc))
         
         # Update upline balances
         await db.users.update_one(
             {"user_id": upline["user_id"]},
             {"$inc": {"commission_balance": commission_amount, "wallet_balance": commission_amount}}
         )
+        user_cache.invalidate(upline["user_id"])
+        await platform_stats.increment(total_commissions_paid=commission_amount)
+        await daily_rollups.record("commissions", commission_amount)
         
         logger.info(f"Commission distributed: ${commission_amount:.2f} to {upline.get('email')}")
         
@@ -401,11 +557,12 @@ async def reset_password(request: ResetPasswordRequest, background_tasks: Backgr
         raise HTTPException(status_code=404, detail="User not found")
     
     # Update password (use password_hash field to match login endpoint)
-    hashed_password = get_password_hash(request.new_password)
+    hashed_password = await get_password_hash_async(request.new_password)
     await db.users.update_one(
         {"email": request.email},
         {"$set": {"password_hash": hashed_password, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    user_cache.invalidate(user["user_id"])
     
     # Mark reset code as used
     await db.password_resets.update_one(
@@ -451,7 +608,7 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks):
         "user_id": user_id,
         "email": user_data.email,
         "full_name": user_data.full_name,
-        "password_hash": get_password_hash(user_data.password),
+        "password_hash": await get_password_hash_async(user_data.password),
         "role": UserRole.USER,
         "level": 1,
         "total_investment": 0.0,
@@ -470,6 +627,7 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks):
     
     await db.users.insert_one(user_doc)
     user_doc.pop("_id", None)
+    await daily_rollups.record("registrations")
     
     # Update referrer's direct referrals
     await db.users.update_one(
@@ -493,9 +651,17 @@ async def register(user_data: UserCreate, background_tasks: BackgroundTasks):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_password_async(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Transparently upgrade hashes made with an old bcrypt cost
+    if password_needs_rehash(user["password_hash"]):
+        await db.users.update_one(
+            {"user_id": user["user_id"], "password_hash": user["password_hash"]},
+            {"$set": {"password_hash": await get_password_hash_async(credentials.password)}}
+        )
+        user_cache.invalidate(user["user_id"])
+    
     # Check if email is verified
     if not user.get("is_email_verified", False):
         raise HTTPException(status_code=403, detail="Please verify your email before logging in")
@@ -512,13 +678,17 @@ async def login(credentials: UserLogin):
 
 @api_router.get("/user/profile", response_model=UserResponse)
 async def get_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+    # The cached user omits the referral arrays; load the full profile
+    user = await db.users.find_one({"user_id": current_user.user_id}, {"_id": 0, "password_hash": 0})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 @api_router.put("/user/password")
 async def change_password(request: PasswordChangeRequest, current_user: User = Depends(get_current_user), background_tasks: BackgroundTasks = None):
     # Verify current password
     user = await db.users.find_one({"user_id": current_user.user_id}, {"_id": 0})
-    if not verify_password(request.current_password, user["password_hash"]):
+    if not await verify_password_async(request.current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Validate new password
@@ -529,11 +699,12 @@ async def change_password(request: PasswordChangeRequest, current_user: User = D
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
     
     # Update password
-    new_hash = get_password_hash(request.new_password)
+    new_hash = await get_password_hash_async(request.new_password)
     await db.users.update_one(
         {"user_id": current_user.user_id},
         {"$set": {"password_hash": new_hash}}
     )
+    user_cache.invalidate(current_user.user_id)
     
     # Send confirmation email
     if background_tasks:
@@ -547,6 +718,16 @@ async def change_password(request: PasswordChangeRequest, current_user: User = D
 
 @api_router.get("/user/dashboard")
 async def get_dashboard(current_user: User = Depends(get_current_user)):
+    # Balances come from the stored document: the user cache is per worker and may
+    # still hold values from before another worker credited or debited this user
+    balances = await db.users.find_one(
+        {"user_id": current_user.user_id},
+        {"_id": 0, "roi_balance": 1, "commission_balance": 1, "total_investment": 1}
+    ) or {}
+    roi_balance = balances.get("roi_balance", 0.0)
+    commission_balance = balances.get("commission_balance", 0.0)
+    total_investment = balances.get("total_investment", 0.0)
+    
     # Get user's active staking to determine current package
     active_stake = await db.staking.find_one(
         {"user_id": current_user.user_id, "status": StakingStatus.ACTIVE},
@@ -572,6 +753,7 @@ async def get_dashboard(current_user: User = Depends(get_current_user)):
                     {"user_id": current_user.user_id},
                     {"$set": {"level": actual_level}}
                 )
+                user_cache.invalidate(current_user.user_id)
         else:
             daily_roi = active_stake.get("daily_roi", 0.0)
     else:
@@ -597,7 +779,18 @@ async def get_dashboard(current_user: User = Depends(get_current_user)):
         active_staking += stake.get("amount", 0.0)
     
     # Total balance = ROI + Commission (withdrawable)
-    total_balance = current_user.roi_balance + current_user.commission_balance
+    total_balance = roi_balance + commission_balance
+    
+    # Referral array sizes (not part of the cached user)
+    counts = await db.users.aggregate([
+        {"$match": {"user_id": current_user.user_id}},
+        {"$project": {
+            "_id": 0,
+            "direct": {"$size": {"$ifNull": ["$direct_referrals", []]}},
+            "indirect": {"$size": {"$ifNull": ["$indirect_referrals", []]}}
+        }}
+    ]).to_list(1)
+    referral_counts = counts[0] if counts else {"direct": 0, "indirect": 0}
     
     # Get referral tree for level-wise counts
     referral_tree = await get_user_referral_tree(current_user.user_id)
@@ -632,8 +825,8 @@ async def get_dashboard(current_user: User = Depends(get_current_user)):
         
         # Calculate progress towards next level
         promotion_progress = {
-            "investment_met": current_user.total_investment >= next_package.get("min_investment", 0),
-            "investment_current": current_user.total_investment,
+            "investment_met": total_investment >= next_package.get("min_investment", 0),
+            "investment_current": total_investment,
             "investment_required": next_package.get("min_investment", 0),
             "direct_met": team_counts["level_1"] >= next_package.get("direct_required", 0),
             "direct_current": team_counts["level_1"],
@@ -669,14 +862,14 @@ async def get_dashboard(current_user: User = Depends(get_current_user)):
     
     return DashboardStats(
         total_balance=total_balance,
-        roi_balance=current_user.roi_balance,
-        commission_balance=current_user.commission_balance,
-        total_investment=current_user.total_investment,
+        roi_balance=roi_balance,
+        commission_balance=commission_balance,
+        total_investment=total_investment,
         active_staking=active_staking,
         current_level=actual_level,  # Use actual level from active staking
         daily_roi_percentage=daily_roi,
-        direct_referrals=len(current_user.direct_referrals),
-        indirect_referrals=len(current_user.indirect_referrals),
+        direct_referrals=referral_counts["direct"],
+        indirect_referrals=referral_counts["indirect"],
         total_commissions=total_commissions,
         pending_withdrawals=pending_withdrawals,
         next_level_requirements=next_level_requirements,
@@ -706,83 +899,54 @@ async def get_team(current_user: User = Depends(get_current_user)):
     return result
 
 @api_router.get("/user/transactions")
-async def get_all_transactions(current_user: User = Depends(get_current_user)):
-    """Get all transactions for the user"""
-    transactions = []
-    
-    # Get deposits
-    deposits = await db.deposits.find({"user_id": current_user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    for d in deposits:
-        transactions.append({
-            "transaction_id": d["deposit_id"],
-            "type": "deposit",
-            "amount": d["amount"],
-            "status": d["status"],
-            "description": f"Deposit via {d.get('payment_method', 'USDT')}",
-            "created_at": d["created_at"],
-            "metadata": {"payment_method": d.get("payment_method")}
-        })
-    
-    # Get withdrawals
-    withdrawals = await db.withdrawals.find({"user_id": current_user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    for w in withdrawals:
-        transactions.append({
-            "transaction_id": w["withdrawal_id"],
-            "type": "withdrawal",
-            "amount": -w["amount"],
-            "status": w["status"],
-            "description": f"Withdrawal to {w.get('wallet_address', '')[:10]}...",
-            "created_at": w["created_at"],
-            "metadata": {"wallet_address": w.get("wallet_address")}
-        })
-    
-    # Get ROI transactions
-    roi_txs = await db.roi_transactions.find({"user_id": current_user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    for r in roi_txs:
-        transactions.append({
-            "transaction_id": r["transaction_id"],
-            "type": "roi",
-            "amount": r["amount"],
-            "status": "completed",
-            "description": f"Daily ROI ({r.get('roi_percentage', 0)}%)",
-            "created_at": r["created_at"],
-            "metadata": {"roi_percentage": r.get("roi_percentage")}
-        })
-    
-    # Get commissions
-    commissions = await db.commissions.find({"user_id": current_user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    for c in commissions:
-        level_name = c.get("commission_type", "LEVEL_1").replace("_", " ")
-        transactions.append({
-            "transaction_id": c["commission_id"],
-            "type": "commission",
-            "amount": c["amount"],
-            "status": "completed",
-            "description": f"{level_name} Commission ({c.get('percentage', 0)}%) from {c.get('from_user_name', 'team member')}",
-            "created_at": c["created_at"],
-            "metadata": {
-                "from_user": c.get("from_user_name"),
-                "level": c.get("level_depth"),
-                "percentage": c.get("percentage")
-            }
-        })
-    
-    # Sort all by date
-    transactions.sort(key=lambda x: x["created_at"], reverse=True)
-    
+async def get_all_transactions(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    type: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Get all transactions for the user, newest first, from the ledger"""
+    query = {"user_id": current_user.user_id}
+    if type:
+        if type not in LEDGER_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown transaction type: {type}")
+        query["type"] = type
+    
+    transactions = await get_page(response, db.ledger, query, {"_id": 0, "user_id": 0}, "created_at", "transaction_id", limit, cursor)
     return transactions
 
+@api_router.get("/user/transactions/export")
+async def export_transactions(
+    current_user: User = Depends(get_current_user),
+    type: Optional[str] = None,
+    format: str = "csv"
+):
+    """Export the user's full transaction history"""
+    query = {"user_id": current_user.user_id}
+    if type:
+        if type not in LEDGER_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown transaction type: {type}")
+        query["type"] = type
+    return export_response("transactions", query, format)
+
 # ============== DEPOSIT ENDPOINTS ==============
 
 @api_router.post("/deposits")
 async def create_deposit(deposit_data: DepositCreate, current_user: User = Depends(get_current_user)):
+    # Never store inline image data on the deposit itself
+    screenshot = {"screenshot_url": deposit_data.screenshot_url, "screenshot_blob": None,
+                  "screenshot_thumb_blob": None, "screenshot_thumbnail_url": None}
+    if deposit_data.screenshot_url and deposit_data.screenshot_url.startswith("data:"):
+        screenshot = await store_screenshot_data_url(deposit_data.screenshot_url, current_user.user_id)
+    
     deposit_doc = {
         "deposit_id": str(uuid.uuid4()),
         "user_id": current_user.user_id,
         "amount": deposit_data.amount,
         "payment_method": deposit_data.payment_method,
         "transaction_hash": deposit_data.transaction_hash,
-        "screenshot_url": deposit_data.screenshot_url,
+        **screenshot,
         "status": DepositStatus.PENDING,
         "created_at": datetime.now(timezone.utc).isoformat(),
         "approved_at": None,
@@ -792,15 +956,16 @@ async def create_deposit(deposit_data: DepositCreate, current_user: User = Depen
     
     await db.deposits.insert_one(deposit_doc)
     deposit_doc.pop("_id", None)
+    await ledger.append(deposit_entry(deposit_doc))
     deposit_doc["status"] = deposit_doc["status"].value
     deposit_doc["payment_method"] = deposit_doc["payment_method"].value
     
-    return deposit_doc
+    return with_signed_screenshot_urls(deposit_doc)
 
 @api_router.get("/deposits")
 async def get_deposits(current_user: User = Depends(get_current_user)):
     deposits = await db.deposits.find({"user_id": current_user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return deposits
+    return [with_signed_screenshot_urls(d) for d in deposits]
 
 @api_router.post("/deposits/{deposit_id}/upload-screenshot")
 async def upload_screenshot(deposit_id: str, file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
@@ -808,29 +973,91 @@ async def upload_screenshot(deposit_id: str, file: UploadFile = File(...), curre
     if not deposit:
         raise HTTPException(status_code=404, detail="Deposit not found")
     
-    contents = await file.read()
-    screenshot_base64 = base64.b64encode(contents).decode('utf-8')
-    screenshot_url = f"data:image/png;base64,{screenshot_base64}"
+    screenshot = await store_screenshot_upload(file, current_user.user_id)
     
     await db.deposits.update_one(
         {"deposit_id": deposit_id},
-        {"$set": {"screenshot_url": screenshot_url}}
+        {"$set": screenshot}
     )
     
-    return {"message": "Screenshot uploaded", "screenshot_url": screenshot_url}
+    with_signed_screenshot_urls(screenshot)
+    return {
+        "message": "Screenshot uploaded",
+        "screenshot_url": screenshot["screenshot_url"],
+        "screenshot_thumbnail_url": screenshot["screenshot_thumbnail_url"]
+    }
+
+# ============== BLOB ENDPOINTS ==============
+
+async def can_read_blob(blob: dict, expires: Optional[int], sig: Optional[str], authorization: Optional[str]) -> bool:
+    if expires is not None and sig:
+        return expires > time.time() and verify_signature(f"blob:{blob['sha256']}:{expires}", sig)
+    if not authorization:
+        return False
+    try:
+        user = await get_current_user(authorization)
+    except HTTPException:
+        return False
+    return user.role == UserRole.ADMIN or user.user_id in blob.get("owner_ids", [])
+
+async def assign_blob_owners():
+    """Record deposit owners on blobs stored before blobs carried owner_ids (runs once)"""
+    if not await db.blobs.find_one({"owner_ids": {"$exists": False}}, {"_id": 0, "sha256": 1}):
+        return
+    query = {"screenshot_blob": {"$type": "string"}}
+    projection = {"_id": 0, "user_id": 1, "screenshot_blob": 1, "screenshot_thumb_blob": 1}
+    async for deposit in db.deposits.find(query, projection):
+        for sha256 in (deposit["screenshot_blob"], deposit.get("screenshot_thumb_blob")):
+            if sha256:
+                await blob_store.add_owner(sha256, deposit["user_id"])
+    result = await db.blobs.update_many({"owner_ids": {"$exists": False}}, {"$set": {"owner_ids": []}})
+    logger.info(f"Assigned blob owners from deposits ({result.modified_count} blobs without an owner)")
+
+@api_router.get("/blobs/{sha256}")
+async def get_blob(
+    sha256: str,
+    expires: Optional[int] = None,
+    sig: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Serve a stored image to its owners and admins (bearer token), or to anyone
+    holding an unexpired signed link; everyone else gets 404
+    """
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    blob = await blob_store.get(sha256)
+    if not blob or not await can_read_blob(blob, expires, sig, authorization):
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    etag = f'"{sha256}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    headers["Content-Length"] = str(blob["size"])
+    return StreamingResponse(blob_store.iter_chunks(sha256), media_type=blob["content_type"], headers=headers)
 
 # ============== WITHDRAWAL ENDPOINTS ==============
 
 @api_router.post("/withdrawals")
 async def create_withdrawal(withdrawal_data: WithdrawalCreate, current_user: User = Depends(get_current_user)):
-    # Check withdrawable balance (ROI + Commission)
-    withdrawable_balance = current_user.roi_balance + current_user.commission_balance
+    # Check withdrawable balance (ROI + Commission) against fresh balances, never the cached user
+    balances = await db.users.find_one(
+        {"user_id": current_user.user_id},
+        {"_id": 0, "roi_balance": 1, "commission_balance": 1}
+    )
+    roi_balance = balances.get("roi_balance", 0.0)
+    commission_balance = balances.get("commission_balance", 0.0)
+    withdrawable_balance = roi_balance + commission_balance
     
     if withdrawal_data.amount > withdrawable_balance:
         raise HTTPException(status_code=400, detail="Insufficient withdrawable balance")
     
     # Check if withdrawal is allowed today (based on admin settings)
-    settings = await db.admin_settings.find_one({"settings_id": "default"}, {"_id": 0})
+    settings = await settings_cache.get()
     if settings:
         withdrawal_dates = settings.get("withdrawal_dates", [1, 15])
         today = datetime.now(timezone.utc).day
@@ -855,13 +1082,14 @@ async def create_withdrawal(withdrawal_data: WithdrawalCreate, current_user: Use
     
     await db.withdrawals.insert_one(withdrawal_doc)
     withdrawal_doc.pop("_id", None)
+    await ledger.append(withdrawal_entry(withdrawal_doc))
     withdrawal_doc["status"] = withdrawal_doc["status"].value
     
     # Deduct from balances (prefer commission first, then ROI)
     remaining = withdrawal_data.amount
-    commission_deduct = min(remaining, current_user.commission_balance)
+    commission_deduct = min(remaining, commission_balance)
     remaining -= commission_deduct
-    roi_deduct = min(remaining, current_user.roi_balance)
+    roi_deduct = min(remaining, roi_balance)
     
     await db.users.update_one(
         {"user_id": current_user.user_id},
@@ -871,6 +1099,7 @@ async def create_withdrawal(withdrawal_data: WithdrawalCreate, current_user: Use
             "wallet_balance": -withdrawal_data.amount
         }}
     )
+    user_cache.invalidate(current_user.user_id)
     
     return withdrawal_doc
 
@@ -921,8 +1150,9 @@ async def create_staking(staking_data: StakingCreate, current_user: User = Depen
     if approved_deposits == 0:
         raise HTTPException(status_code=400, detail="Please make a deposit first before staking")
     
-    # Check balance
-    if current_user.wallet_balance < staking_data.amount:
+    # Check balance against the stored value, never the cached user
+    balances = await db.users.find_one({"user_id": current_user.user_id}, {"_id": 0, "wallet_balance": 1})
+    if balances.get("wallet_balance", 0.0) < staking_data.amount:
         raise HTTPException(status_code=400, detail="Insufficient balance. Please deposit first.")
     
     # Get package
@@ -973,6 +1203,8 @@ async def create_staking(staking_data: StakingCreate, current_user: User = Depen
             "total_investment": staking_data.amount
         }}
     )
+    user_cache.invalidate(current_user.user_id)
+    await platform_stats.increment(active_stakes_count=1, active_stakes_volume=staking_data.amount)
     
     # Distribute commissions to upline
     if background_tasks:
@@ -988,6 +1220,7 @@ async def create_staking(staking_data: StakingCreate, current_user: User = Depen
             {"user_id": current_user.user_id},
             {"$set": {"level": new_level}}
         )
+        user_cache.invalidate(current_user.user_id)
         if background_tasks:
             background_tasks.add_task(
                 email_service.send_level_promotion,
@@ -1057,78 +1290,316 @@ async def get_membership_packages():
 
 @api_router.get("/settings")
 async def get_settings():
-    settings = await db.admin_settings.find_one({"settings_id": "default"}, {"_id": 0})
-    if not settings:
-        default_settings = {
-            "settings_id": "default",
-            "usdt_wallet_address": "",
-            "qr_code_image": None,
-            "withdrawal_dates": [1, 15],
-            "community_star_target": 28.0,
-            "community_star_bonus_min": 100.0,
-            "community_star_bonus_max": 1000.0,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.admin_settings.insert_one(default_settings)
-        return default_settings
+    settings = await settings_cache.get()
+    settings.pop("qr_code_blob", None)
     return settings
 
+def qr_code_url(sha256: str) -> str:
+    """The QR code URL changes with its content, so it can be cached forever"""
+    return f"/api/settings/qr-code/{sha256}"
+
+@api_router.get("/settings/qr-code/{sha256}")
+async def get_qr_code(sha256: str, if_none_match: Optional[str] = Header(None)):
+    """Serve the deposit QR code; only the version referenced by the current settings is public"""
+    settings = await settings_cache.get()
+    if settings.get("qr_code_blob") != sha256:
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    blob = await blob_store.get(sha256)
+    if not blob:
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    etag = f'"{sha256}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    headers["Content-Length"] = str(blob["size"])
+    return StreamingResponse(blob_store.iter_chunks(sha256), media_type=blob["content_type"], headers=headers)
+
+async def migrate_qr_code_image():
+    """Move a legacy inline data-URL QR code out of admin_settings into the blob store"""
+    data_url = (await settings_cache.get()).get("qr_code_image")
+    if not data_url or not data_url.startswith("data:"):
+        return
+    try:
+        blob = await blob_store.save_bytes(base64.b64decode(data_url.split(",", 1)[1]))
+    except (IndexError, ValueError) as e:
+        logger.error(f"Could not migrate QR code image: {e}")
+        return
+    await settings_cache.update({"qr_code_image": qr_code_url(blob["sha256"]), "qr_code_blob": blob["sha256"]})
+    logger.info("Moved QR code image into the blob store")
+
 # ============== CRYPTO PRICE ENDPOINTS ==============
 
 @api_router.get("/crypto/prices")
-async def get_crypto_prices():
-    """Get live cryptocurrency prices"""
-    prices = await crypto_service.get_prices()
-    return prices
+async def get_crypto_prices(if_none_match: Optional[str] = Header(None)):
+    """Get live cryptocurrency prices; headers say when they were fetched"""
+    body, etag = await crypto_service.get_payload()
+    freshness = crypto_service.freshness()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "X-Prices-Stale": "true" if freshness["stale"] else "false"
+    }
+    if freshness["updated_at"]:
+        headers["X-Prices-Updated-At"] = freshness["updated_at"]
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    # Encoded once per refresh; returned as-is without re-serializing
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@api_router.get("/crypto/prices/stream")
+async def stream_crypto_prices(request: Request):
+    """Server-Sent Events: the current prices, then every refresh, to all clients from one fetch"""
+    try:
+        events = price_broadcaster.subscribe(request.is_disconnected)
+    except TooManySubscribersError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/crypto/prices/{symbol}")
+async def get_crypto_price(symbol: str):
+    """Current price of one coin, with when it was last fetched"""
+    coin = crypto_service.get_coin(symbol)
+    if coin is None:
+        raise HTTPException(status_code=404, detail="Unknown or not yet priced symbol")
+    return coin
+
+@api_router.get("/crypto/history/{symbol}")
+async def get_crypto_history(symbol: str, range: str = Query("1d", description="1h, 1d, 7d, 30d or 1y")):
+    """Chart-ready OHLC series for one coin, served from pre-aggregated buckets"""
+    if range not in PRICE_HISTORY_RANGES:
+        raise HTTPException(status_code=400, detail=f"range must be one of: {', '.join(PRICE_HISTORY_RANGES)}")
+    series = price_history.get_series(symbol.upper(), range)
+    if series is None:
+        raise HTTPException(status_code=404, detail="No price history for this symbol")
+    return series
+
+def valuation_symbols(symbols: str) -> List[str]:
+    requested = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+    if not requested or len(requested) > 10:
+        raise HTTPException(status_code=400, detail="Give between 1 and 10 symbols")
+    unknown = [s for s in requested if not crypto_service.tracks(s)]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown symbols: {', '.join(unknown)}")
+    return requested
+
+@api_router.get("/user/portfolio/valuation")
+async def get_portfolio_valuation(symbols: str = "BTC,ETH", current_user: User = Depends(get_current_user)):
+    """The user's balances and active stakes valued in crypto from the cached price snapshot"""
+    requested = valuation_symbols(symbols)
+    balances, active_stakes = await asyncio.gather(
+        db.users.find_one(
+            {"user_id": current_user.user_id},
+            {"_id": 0, "wallet_balance": 1, "roi_balance": 1, "commission_balance": 1}
+        ),
+        sum_amount(db.staking, {"user_id": current_user.user_id, "status": StakingStatus.ACTIVE})
+    )
+    amounts = {
+        "wallet_balance": balances.get("wallet_balance", 0.0),
+        "roi_balance": balances.get("roi_balance", 0.0),
+        "commission_balance": balances.get("commission_balance", 0.0),
+        "active_stakes": active_stakes
+    }
+    return crypto_service.valuation(amounts, requested)
+
+@api_router.get("/admin/platform/liabilities/valuation")
+async def get_platform_liabilities_valuation(symbols: str = "BTC,ETH", admin: User = Depends(get_admin_user)):
+    """All user balances and active stakes, summed in one aggregation pass and valued in crypto"""
+    requested = valuation_symbols(symbols)
+    totals, stats = await asyncio.gather(
+        db.users.aggregate([
+            {"$match": {"role": {"$ne": UserRole.ADMIN}}},
+            {"$group": {
+                "_id": None,
+                "wallet_balance": {"$sum": "$wallet_balance"},
+                "roi_balance": {"$sum": "$roi_balance"},
+                "commission_balance": {"$sum": "$commission_balance"},
+                "users": {"$sum": 1}
+            }}
+        ]).to_list(1),
+        platform_stats.get()
+    )
+    totals = totals[0] if totals else {}
+    amounts = {
+        "wallet_balance": totals.get("wallet_balance", 0.0),
+        "roi_balance": totals.get("roi_balance", 0.0),
+        "commission_balance": totals.get("commission_balance", 0.0),
+        "active_stakes": stats.get("active_stakes_volume", 0.0)
+    }
+    return {"users": totals.get("users", 0), **crypto_service.valuation(amounts, requested)}
+
+@api_router.get("/admin/crypto/coins")
+async def get_crypto_coins(admin: User = Depends(get_admin_user)):
+    """The coin universe the price service tracks"""
+    return [{"id": coin_id, **coin} for coin_id, coin in crypto_service.coins.items()]
+
+@api_router.put("/admin/crypto/coins")
+async def update_crypto_coins(coins: List[CryptoCoin], admin: User = Depends(get_admin_user)):
+    """Replace the tracked coins; an empty list restores the defaults. Applies to every worker via settings."""
+    symbols = [coin.symbol.upper() for coin in coins]
+    if len(set(symbols)) != len(symbols) or len({coin.id for coin in coins}) != len(coins):
+        raise HTTPException(status_code=400, detail="Coin ids and symbols must be unique")
+    
+    await settings_cache.update({"crypto_coins": [coin.model_dump() for coin in coins] or None})
+    return await get_crypto_coins(admin)
+
+@api_router.get("/admin/crypto/stats")
+async def get_crypto_stats(admin: User = Depends(get_admin_user)):
+    """Upstream price fetch counters and latency, plus price stream clients"""
+    return {**crypto_service.stats(), "stream": price_broadcaster.stats()}
 
 # ============== ADMIN ENDPOINTS ==============
 
 @api_router.get("/admin/dashboard")
 async def get_admin_dashboard(admin: User = Depends(get_admin_user)):
-    total_users = await db.users.count_documents({})
-    
-    deposits = await db.deposits.find({"status": DepositStatus.APPROVED}, {"_id": 0}).to_list(10000)
-    total_deposits = sum(d.get("amount", 0) for d in deposits)
-    
-    withdrawals = await db.withdrawals.find({"status": WithdrawalStatus.APPROVED}, {"_id": 0}).to_list(10000)
-    total_withdrawals = sum(w.get("amount", 0) for w in withdrawals)
-    
-    pending_deposits = await db.deposits.count_documents({"status": DepositStatus.PENDING})
-    pending_withdrawals = await db.withdrawals.count_documents({"status": WithdrawalStatus.PENDING})
-    
-    total_active_stakes = await db.staking.count_documents({"status": StakingStatus.ACTIVE})
-    
-    commissions = await db.commissions.find({}, {"_id": 0}).to_list(10000)
-    total_commissions_paid = sum(c.get("amount", 0) for c in commissions)
-    
-    roi_transactions = await db.roi_transactions.find({}, {"_id": 0}).to_list(10000)
-    total_roi_paid = sum(r.get("amount", 0) for r in roi_transactions)
+    stats, total_users, pending_deposits, pending_withdrawals = await asyncio.gather(
+        platform_stats.get(),
+        db.users.estimated_document_count(),
+        db.deposits.count_documents({"status": DepositStatus.PENDING}),
+        db.withdrawals.count_documents({"status": WithdrawalStatus.PENDING})
+    )
     
     return AdminDashboardStats(
         total_users=total_users,
-        total_deposits=total_deposits,
-        total_withdrawals=total_withdrawals,
+        total_deposits=stats.get("total_deposits", 0.0),
+        total_withdrawals=stats.get("total_withdrawals", 0.0),
         pending_deposits=pending_deposits,
         pending_withdrawals=pending_withdrawals,
-        total_active_stakes=total_active_stakes,
-        total_commissions_paid=total_commissions_paid,
-        total_roi_paid=total_roi_paid
+        total_active_stakes=stats.get("active_stakes_count", 0),
+        total_commissions_paid=stats.get("total_commissions_paid", 0.0),
+        total_roi_paid=stats.get("total_roi_paid", 0.0)
     )
 
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(admin: User = Depends(get_admin_user)):
+    """Hit/miss counters for in-process caches"""
+    return {
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "settings_cache": settings_cache.stats()
+    }
+
+@api_router.post("/admin/platform-stats/verify")
+async def verify_platform_stats(fix: bool = True, admin: User = Depends(get_admin_user)):
+    """Recompute platform running totals from source collections and report drift"""
+    return await platform_stats.verify(fix=fix)
+
+@api_router.get("/admin/analytics/daily")
+async def get_daily_analytics(
+    start_date: str,
+    end_date: str,
+    metrics: Optional[str] = None,
+    admin: User = Depends(get_admin_user)
+):
+    """Get per-day rollups (count and total) for a date range (YYYY-MM-DD, inclusive)"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    
+    metric_list = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else list(ROLLUP_METRICS)
+    unknown = [m for m in metric_list if m not in ROLLUP_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(unknown)}")
+    
+    rollups = await daily_rollups.get_range(start_date, end_date, metric_list)
+    
+    series = {m: [] for m in metric_list}
+    for r in rollups:
+        series[r["metric"]].append({"date": r["date"], "count": r.get("count", 0), "total": r.get("total", 0.0)})
+    
+    return {"start_date": start_date, "end_date": end_date, "series": series}
+
+@api_router.post("/admin/blobs/migrate-screenshots")
+async def migrate_deposit_screenshots(admin: User = Depends(get_admin_user)):
+    """Move legacy inline screenshots into the blob store and thumbnail stored ones that lack a thumbnail"""
+    migrated, failed = 0, []
+    query = {"$or": [
+        {"screenshot_url": {"$regex": "^data:"}},
+        {"screenshot_blob": {"$type": "string"}, "screenshot_thumb_blob": None}
+    ]}
+    projection = {"_id": 0, "deposit_id": 1, "user_id": 1, "screenshot_url": 1, "screenshot_blob": 1}
+    async for deposit in db.deposits.find(query, projection):
+        try:
+            if deposit.get("screenshot_blob"):
+                screenshot = await store_screenshot(await blob_store.read_bytes(deposit["screenshot_blob"]), deposit["user_id"])
+            else:
+                screenshot = await store_screenshot_data_url(deposit["screenshot_url"], deposit["user_id"])
+        except HTTPException as e:
+            failed.append({"deposit_id": deposit["deposit_id"], "error": e.detail})
+            continue
+        await db.deposits.update_one({"deposit_id": deposit["deposit_id"]}, {"$set": screenshot})
+        migrated += 1
+    return {"migrated": migrated, "failed": failed}
+
+@api_router.post("/admin/ledger/backfill")
+async def backfill_ledger(admin: User = Depends(get_admin_user)):
+    """Populate the transaction ledger from deposits, withdrawals, ROI and commissions"""
+    return await ledger.backfill()
+
+@api_router.post("/admin/analytics/backfill")
+async def backfill_daily_analytics(admin: User = Depends(get_admin_user)):
+    """Rebuild daily rollups from raw history"""
+    return await daily_rollups.backfill()
+
+@api_router.get("/admin/export/{export_name}")
+async def export_history(
+    export_name: str,
+    format: str = "csv",
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    admin: User = Depends(get_admin_user)
+):
+    """Export deposits, withdrawals, commissions, roi or transactions (ledger) history"""
+    if export_name not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {export_name}")
+    
+    return export_response(export_name, history_query(status, user_id), format)
+
+async def get_users_by_id(user_ids: List[str]) -> dict:
+    """Look up email and name for a batch of users in a single query"""
+    users = await db.users.find(
+        {"user_id": {"$in": list(set(user_ids))}},
+        {"_id": 0, "user_id": 1, "email": 1, "full_name": 1}
+    ).to_list(None)
+    return {u["user_id"]: u for u in users}
+
 @api_router.get("/admin/users")
-async def get_all_users(admin: User = Depends(get_admin_user)):
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).sort("created_at", -1).to_list(1000)
+async def get_all_users(
+    response: Response,
+    admin: User = Depends(get_admin_user),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    users = await get_page(response, db.users, {}, {"_id": 0, "password_hash": 0}, "created_at", "user_id", limit, cursor)
     return users
 
 @api_router.get("/admin/deposits")
-async def get_all_deposits(admin: User = Depends(get_admin_user)):
-    deposits = await db.deposits.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+async def get_all_deposits(
+    response: Response,
+    admin: User = Depends(get_admin_user),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: Optional[str] = None
+):
+    deposits = await get_page(response, db.deposits, history_query(status, user_id), {"_id": 0}, "created_at", "deposit_id", limit, cursor)
+    users_by_id = await get_users_by_id([d["user_id"] for d in deposits])
     
     enriched_deposits = []
     for deposit in deposits:
-        user = await db.users.find_one({"user_id": deposit["user_id"]}, {"_id": 0, "email": 1, "full_name": 1})
+        user = users_by_id.get(deposit["user_id"])
         deposit_with_user = {
-            **deposit,
+            **with_signed_screenshot_urls(deposit),
             "user_email": user.get("email") if user else "Unknown",
             "user_name": user.get("full_name") if user else "Unknown"
         }
@@ -1161,6 +1632,10 @@ async def approve_deposit(deposit_id: str, admin: User = Depends(get_admin_user)
         {"user_id": user_id},
         {"$inc": {"wallet_balance": amount}}
     )
+    user_cache.invalidate(user_id)
+    await ledger.set_status(deposit_id, DepositStatus.APPROVED)
+    await platform_stats.increment(total_deposits=amount)
+    await daily_rollups.record("deposits", amount)
     
     # Send notification email
     user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
@@ -1188,6 +1663,7 @@ async def reject_deposit(deposit_id: str, reason: str, admin: User = Depends(get
             "approved_by": admin.user_id
         }}
     )
+    await ledger.set_status(deposit_id, DepositStatus.REJECTED)
     
     # Send notification email
     user = await db.users.find_one({"user_id": deposit["user_id"]}, {"_id": 0})
@@ -1203,12 +1679,20 @@ async def reject_deposit(deposit_id: str, reason: str, admin: User = Depends(get
     return {"message": "Deposit rejected"}
 
 @api_router.get("/admin/withdrawals")
-async def get_all_withdrawals(admin: User = Depends(get_admin_user)):
-    withdrawals = await db.withdrawals.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+async def get_all_withdrawals(
+    response: Response,
+    admin: User = Depends(get_admin_user),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    user_id: Optional[str] = None
+):
+    withdrawals = await get_page(response, db.withdrawals, history_query(status, user_id), {"_id": 0}, "created_at", "withdrawal_id", limit, cursor)
+    users_by_id = await get_users_by_id([w["user_id"] for w in withdrawals])
     
     enriched = []
     for w in withdrawals:
-        user = await db.users.find_one({"user_id": w["user_id"]}, {"_id": 0, "email": 1, "full_name": 1})
+        user = users_by_id.get(w["user_id"])
         enriched.append({
             **w,
             "user_email": user.get("email") if user else "Unknown",
@@ -1232,6 +1716,9 @@ async def approve_withdrawal(withdrawal_id: str, transaction_hash: str, admin: U
             "transaction_hash": transaction_hash
         }}
     )
+    await ledger.set_status(withdrawal_id, WithdrawalStatus.APPROVED)
+    await platform_stats.increment(total_withdrawals=withdrawal["amount"])
+    await daily_rollups.record("withdrawals", withdrawal["amount"])
     
     # Send notification email
     user = await db.users.find_one({"user_id": withdrawal["user_id"]}, {"_id": 0})
@@ -1260,6 +1747,7 @@ async def reject_withdrawal(withdrawal_id: str, reason: str, admin: User = Depen
             "approved_by": admin.user_id
         }}
     )
+    await ledger.set_status(withdrawal_id, WithdrawalStatus.REJECTED)
     
     # Restore balance
     await db.users.update_one(
@@ -1269,6 +1757,7 @@ async def reject_withdrawal(withdrawal_id: str, reason: str, admin: User = Depen
             "roi_balance": withdrawal["amount"]  # Restore to ROI balance
         }}
     )
+    user_cache.invalidate(withdrawal["user_id"])
     
     # Send notification email
     user = await db.users.find_one({"user_id": withdrawal["user_id"]}, {"_id": 0})
@@ -1362,27 +1851,22 @@ async def update_staking_package(staking_id: str, package: StakingPackage, admin
 # Admin Settings
 @api_router.put("/admin/settings")
 async def update_settings(settings: AdminSettings, admin: User = Depends(get_admin_user)):
-    settings_dict = settings.model_dump()
-    settings_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
-    await db.admin_settings.update_one(
-        {"settings_id": "default"},
-        {"$set": settings_dict},
-        upsert=True
-    )
-    return settings_dict
+    # The QR code is only ever set by its upload endpoint; saving without one removes it
+    settings_dict = settings.model_dump(exclude={"qr_code_image"})
+    if not settings.qr_code_image:
+        settings_dict.update({"qr_code_image": None, "qr_code_blob": None})
+    settings_dict.pop("updated_at")
+    updated = await settings_cache.update(settings_dict)
+    updated.pop("qr_code_blob", None)
+    return updated
 
 @api_router.post("/admin/settings/qr-code")
 async def upload_qr_code(file: UploadFile = File(...), admin: User = Depends(get_admin_user)):
     """Upload QR code image for deposit page"""
-    contents = await file.read()
-    qr_base64 = base64.b64encode(contents).decode('utf-8')
-    qr_url = f"data:image/png;base64,{qr_base64}"
-    
-    await db.admin_settings.update_one(
-        {"settings_id": "default"},
-        {"$set": {"qr_code_image": qr_url, "updated_at": datetime.now(timezone.utc).isoformat()}},
-        upsert=True
-    )
+    blob = await store_image_upload(file)
+    qr_url = qr_code_url(blob["sha256"])
+    
+    await settings_cache.update({"qr_code_image": qr_url, "qr_code_blob": blob["sha256"]})
     
     return {"message": "QR code uploaded", "qr_code_image": qr_url}
 
@@ -1408,17 +1892,8 @@ async def set_roi_schedule_time(hour: int = 0, minute: int = 0, admin: User = De
     if minute < 0 or minute > 59:
         raise HTTPException(status_code=400, detail="Minute must be between 0 and 59")
     
-    roi_scheduler.set_schedule(hour, minute)
-    
-    # Save to settings
-    await db.admin_settings.update_one(
-        {"settings_id": "default"},
-        {"$set": {
-            "roi_distribution_hour": hour,
-            "roi_distribution_minute": minute
-        }},
-        upsert=True
-    )
+    # Saving applies the schedule here and, via the settings version, on every other worker
+    await settings_cache.update({"roi_distribution_hour": hour, "roi_distribution_minute": minute})
     
     return {
         "message": f"ROI distribution scheduled for {hour:02d}:{minute:02d} UTC daily",
@@ -1427,16 +1902,52 @@ async def set_roi_schedule_time(hour: int = 0, minute: int = 0, admin: User = De
 
 # Get Email Logs
 @api_router.get("/admin/email-logs")
-async def get_email_logs(admin: User = Depends(get_admin_user), limit: int = 100):
+async def get_email_logs(
+    response: Response,
+    admin: User = Depends(get_admin_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """Get recent email logs"""
-    logs = await db.email_logs.find({}, {"_id": 0}).sort("created_at", -1).to_list(limit)
+    logs = await get_page(response, db.email_logs, {}, {"_id": 0}, "created_at", "email_id", limit, cursor)
     return logs
 
+# Email Outbox
+@api_router.get("/admin/email-outbox")
+async def get_email_outbox(
+    response: Response,
+    status: str = Query("dead", pattern="^(pending|sending|dead)$"),
+    admin: User = Depends(get_admin_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Queued, in-flight or dead-lettered emails (without their HTML body)"""
+    return await get_page(
+        response, db.email_outbox, {"status": status}, {"_id": 0, "html_content": 0},
+        "created_at", "message_id", limit, cursor
+    )
+
+@api_router.get("/admin/email-outbox/stats")
+async def get_email_outbox_stats(admin: User = Depends(get_admin_user)):
+    """Outbox depth by status and this worker's delivery counters"""
+    return await email_outbox.stats()
+
+@api_router.post("/admin/email-outbox/retry")
+async def retry_dead_emails(message_id: Optional[str] = None, admin: User = Depends(get_admin_user)):
+    """Requeue one dead-lettered email, or all of them"""
+    requeued = await email_outbox.retry_dead(message_id)
+    return {"requeued": requeued}
+
 # Get System Logs (ROI distributions, etc.)
 @api_router.get("/admin/system-logs")
-async def get_system_logs(admin: User = Depends(get_admin_user), limit: int = 50):
+async def get_system_logs(
+    response: Response,
+    admin: User = Depends(get_admin_user),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """Get system logs including ROI distributions"""
-    logs = await db.system_logs.find({}, {"_id": 0}).sort("run_time", -1).to_list(limit)
+    logs = await get_page(response, db.system_logs, {}, {"_id": 0}, "run_time", "log_id", limit, cursor)
     return logs
 
 # ============== INCLUDE ROUTER AND MIDDLEWARE ==============
@@ -1449,12 +1960,18 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prices-Updated-At", "X-Prices-Stale"],
 )
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting MINEX GLOBAL application...")
     
+    # Create any missing indexes declared in the index registry
+    # Price history collections must be keyed by (symbol, ts) before the registry adds that unique index
+    await price_history.ensure_collections()
+    await ensure_indexes(db)
+    
     # Create/Update admin user
     admin_exists = await db.users.find_one({"email": "admin@minex.online"}, {"_id": 0})
     if not admin_exists:
@@ -1462,7 +1979,7 @@ async def startup_event():
             "user_id": str(uuid.uuid4()),
             "email": "admin@minex.online",
             "full_name": "Admin",
-            "password_hash": get_password_hash("password"),
+            "password_hash": await get_password_hash_async("password"),
             "role": UserRole.ADMIN,
             "level": 6,
             "total_investment": 0.0,
@@ -1495,7 +2012,7 @@ async def startup_event():
             "user_id": str(uuid.uuid4()),
             "email": "masteruser@gmail.com",
             "full_name": "Master User",
-            "password_hash": get_password_hash("password"),
+            "password_hash": await get_password_hash_async("password"),
             "role": UserRole.USER,
             "level": 1,
             "total_investment": 0.0,
@@ -1528,28 +2045,41 @@ async def startup_event():
     if investment_count == 0:
         logger.info("No investment packages found - Admin should create packages via dashboard")
     
-    # Initialize default admin settings
-    settings_exists = await db.admin_settings.find_one({"settings_id": "default"}, {"_id": 0})
-    if not settings_exists:
-        default_settings = {
-            "settings_id": "default",
-            "usdt_wallet_address": "",
-            "qr_code_image": None,
-            "withdrawal_dates": [1, 15],
-            "community_star_target": 28.0,
-            "community_star_bonus_min": 100.0,
-            "community_star_bonus_max": 1000.0,
-            "roi_distribution_hour": 0,
-            "roi_distribution_minute": 0,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.admin_settings.insert_one(default_settings)
-        logger.info("Admin settings initialized")
-    else:
-        # Load ROI schedule from settings
-        roi_hour = settings_exists.get("roi_distribution_hour", 0)
-        roi_minute = settings_exists.get("roi_distribution_minute", 0)
-        roi_scheduler.set_schedule(roi_hour, roi_minute)
+    # Load admin settings (created with defaults on first start) and keep
+    # the ROI schedule in sync with them on every worker
+    def apply_roi_schedule(settings: dict):
+        hour = settings.get("roi_distribution_hour", 0)
+        minute = settings.get("roi_distribution_minute", 0)
+        # Any settings change triggers a reload; rescheduling for an unchanged time could
+        # move a run that is due but not yet picked up by the scheduler loop to tomorrow
+        if (hour, minute) != (roi_scheduler.run_hour, roi_scheduler.run_minute):
+            roi_scheduler.set_schedule(hour, minute)
+    
+    settings_cache.on_change(apply_roi_schedule)
+    settings_cache.on_change(lambda settings: crypto_service.set_coins(settings.get("crypto_coins")))
+    await settings_cache.get()
+    await migrate_qr_code_image()
+    await assign_blob_owners()
+    settings_cache.start()
+    email_outbox.start(email_service.deliver, email_service.log_failure)
+    price_broadcaster.configure_from_env()
+    crypto_service.on_update(price_broadcaster.publish)
+    await price_history.load()
+    crypto_service.on_update(lambda prices: price_history.record(
+        prices, at=crypto_service.last_fetch.timestamp(), persist=crypto_service.is_leader
+    ))
+    # Save the open buckets when leadership moves, including the step-down on shutdown
+    crypto_service.on_leadership_change(lambda leader: price_history.save_open_buckets())
+    await crypto_service.start()
+    
+    # Seed running totals from history on first start
+    if not await db.platform_stats.find_one({"stats_id": "platform"}, {"_id": 0}):
+        await platform_stats.recompute()
+        logger.info("Platform stats initialized from history")
+    
+    # Populate the transaction ledger from history on first start
+    if await db.ledger.estimated_document_count() == 0:
+        await ledger.backfill()
     
     # Start the automatic ROI scheduler
     roi_scheduler.start()
@@ -1558,4 +2088,12 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_db_client():
     roi_scheduler.stop()
+    settings_cache.stop()
+    await email_outbox.stop()
+    await crypto_service.close()  # Steps down, which saves the open price buckets
+    await price_history.flush()
+    shutdown_hash_executor()
+    image_processor.shutdown()
+    if query_recorder:
+        query_recorder.dump(query_shape_log)
     client.close()
@@ -0,0 +1,152 @@
+"""
+Settings Cache for MINEX GLOBAL Platform
+Keeps admin_settings in process memory. Every write bumps a version
+counter on the settings document; each worker polls that counter and
+reloads the document only when it changed.
+"""
+import os
+import copy
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_ID = "default"
+
+DEFAULT_SETTINGS = {
+    "settings_id": SETTINGS_ID,
+    "usdt_wallet_address": "",
+    "qr_code_image": None,
+    "withdrawal_dates": [1, 15],
+    "community_star_target": 28.0,
+    "community_star_bonus_min": 100.0,
+    "community_star_bonus_max": 1000.0,
+    "roi_distribution_hour": 0,
+    "roi_distribution_minute": 0,
+}
+
+
+class SettingsCache:
+    def __init__(self, poll_seconds: float = 2.0):
+        self.db = None
+        self.poll_seconds = poll_seconds
+        self.is_running = False
+        self.version = None
+        self.reloads = 0
+        self._settings: Optional[dict] = None
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._listeners: List[Callable[[dict], None]] = []
+
+    def set_db(self, db):
+        """Set database reference and read SETTINGS_POLL_SECONDS"""
+        self.db = db
+        self.poll_seconds = float(os.environ.get("SETTINGS_POLL_SECONDS", self.poll_seconds))
+
+    def on_change(self, callback: Callable[[dict], None]):
+        """Register a callback run with the new settings whenever they are (re)loaded"""
+        self._listeners.append(callback)
+
+    async def get(self) -> dict:
+        """
+        Return a deep copy of the settings, so callers may mutate nested values.
+        Served from memory while the watcher keeps them fresh; checks the version
+        inline if the watcher fell behind.
+        """
+        if self._settings is None or time.monotonic() - self._checked_at > self.poll_seconds * 3:
+            await self.refresh()
+        return copy.deepcopy(self._settings)
+
+    async def refresh(self, force: bool = False):
+        """Reload the settings if their version changed (or unconditionally with force)"""
+        async with self._get_lock():
+            current = await self.db.admin_settings.find_one({"settings_id": SETTINGS_ID}, {"_id": 0, "version": 1})
+            if current is None:
+                await self._create_defaults()
+            elif force or self._settings is None or current.get("version", 0) != self.version:
+                settings = await self.db.admin_settings.find_one({"settings_id": SETTINGS_ID}, {"_id": 0})
+                self._apply(settings, force)
+            else:
+                self._checked_at = time.monotonic()
+
+    async def update(self, fields: dict) -> dict:
+        """Write settings fields, bump the version and return the new settings"""
+        fields = {**fields, "updated_at": datetime.now(timezone.utc).isoformat()}
+        defaults = {k: v for k, v in DEFAULT_SETTINGS.items() if k not in fields}
+        # Serialized with refresh() so a reload that read an older document
+        # cannot be applied after this write
+        async with self._get_lock():
+            settings = await self.db.admin_settings.find_one_and_update(
+                {"settings_id": SETTINGS_ID},
+                {"$set": fields, "$inc": {"version": 1}, "$setOnInsert": defaults},
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            self._apply(settings)
+        return copy.deepcopy(settings)
+
+    async def _create_defaults(self):
+        settings = await self.db.admin_settings.find_one_and_update(
+            {"settings_id": SETTINGS_ID},
+            {"$setOnInsert": {**DEFAULT_SETTINGS, "version": 1, "updated_at": datetime.now(timezone.utc).isoformat()}},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        logger.info("Admin settings initialized")
+        self._apply(settings, force=True)
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _apply(self, settings: dict, force: bool = False):
+        """Install settings and notify listeners; versions older than the cached one are ignored unless forced"""
+        if not force and self._settings is not None and settings.get("version", 0) < (self.version or 0):
+            logger.info(f"Ignoring stale settings version {settings.get('version', 0)} (have {self.version})")
+            return
+        self._settings = settings
+        self.version = settings.get("version", 0)
+        self._checked_at = time.monotonic()
+        self.reloads += 1
+        for callback in self._listeners:
+            try:
+                callback(copy.deepcopy(settings))
+            except Exception as e:
+                logger.error(f"Settings change listener failed: {e}")
+
+    async def _watch_loop(self):
+        while self.is_running:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Settings version check failed: {e}")
+
+    def start(self):
+        """Start polling the version counter so changes from other workers are picked up"""
+        if not self.is_running:
+            self.is_running = True
+            asyncio.create_task(self._watch_loop())
+
+    def stop(self):
+        self.is_running = False
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "reloads": self.reloads,
+            "poll_seconds": self.poll_seconds,
+            "age_seconds": round(time.monotonic() - self._checked_at, 3) if self._settings else None
+        }
+
+
+# Global instance
+settings_cache = SettingsCache()
@@ -0,0 +1,83 @@
+"""
+MINEX GLOBAL Platform - Admin Pagination Tests
+Testing: Keyset cursor pagination on admin list endpoints
+"""
+import pytest
+import requests
+import json
+import os
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://minex-platform.preview.emergentagent.com').rstrip('/')
+
+ADMIN_EMAIL = "admin@minex.online"
+ADMIN_PASSWORD = "password"
+
+
+class TestAdminPagination:
+    """Test cursor pagination on admin lists"""
+
+    @pytest.fixture
+    def admin_headers(self):
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        if response.status_code != 200:
+            pytest.skip("Admin login failed")
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+
+    def test_users_pages_do_not_overlap(self, admin_headers):
+        """Following X-Next-Cursor returns the next, disjoint page"""
+        first = requests.get(f"{BASE_URL}/api/admin/users", params={"limit": 1}, headers=admin_headers)
+        assert first.status_code == 200
+        assert len(first.json()) == 1
+
+        next_cursor = first.headers.get("X-Next-Cursor")
+        assert next_cursor, "Expected a next cursor with at least 2 users"
+
+        second = requests.get(
+            f"{BASE_URL}/api/admin/users",
+            params={"limit": 1, "cursor": next_cursor},
+            headers=admin_headers
+        )
+        assert second.status_code == 200
+        assert len(second.json()) == 1
+        assert second.json()[0]["user_id"] != first.json()[0]["user_id"]
+        print(f"✓ Users pagination returns disjoint pages")
+
+    def test_invalid_cursor_rejected(self, admin_headers):
+        """Malformed cursor returns 400"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/deposits",
+            params={"cursor": "not-a-cursor"},
+            headers=admin_headers
+        )
+        assert response.status_code == 400
+
+    def test_limit_is_bounded(self, admin_headers):
+        """Limit above the maximum page size is rejected"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/email-logs",
+            params={"limit": 5000},
+            headers=admin_headers
+        )
+        assert response.status_code == 422
+
+    def test_list_and_export_share_filters(self, admin_headers):
+        """The status filter selects the same deposits in the list and in the export"""
+        listed = requests.get(
+            f"{BASE_URL}/api/admin/deposits",
+            params={"status": "approved"},
+            headers=admin_headers
+        )
+        assert listed.status_code == 200
+        assert all(d["status"] == "approved" for d in listed.json())
+
+        exported = requests.get(
+            f"{BASE_URL}/api/admin/export/deposits",
+            params={"status": "approved", "format": "ndjson"},
+            headers=admin_headers
+        )
+        assert exported.status_code == 200
+        exported_ids = [row["deposit_id"] for row in map(json.loads, exported.text.splitlines())]
+        assert exported_ids[:len(listed.json())] == [d["deposit_id"] for d in listed.json()]
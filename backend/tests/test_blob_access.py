@@ -0,0 +1,107 @@
+"""
+MINEX GLOBAL Platform - Blob Access Tests
+Testing: Deposit screenshots are only served to their owner, admins, or
+holders of an unexpired signed link
+"""
+import io
+import os
+import random
+import time
+
+import pytest
+import requests
+from PIL import Image
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://minex-platform.preview.emergentagent.com').rstrip('/')
+
+ADMIN_EMAIL = "admin@minex.online"
+ADMIN_PASSWORD = "password"
+USER_EMAIL = "masteruser@gmail.com"
+USER_PASSWORD = "password"
+
+
+def login(email, password):
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password})
+    if response.status_code != 200:
+        pytest.skip(f"Login failed for {email}")
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def random_png():
+    """A PNG no other test has uploaded, so its blob belongs to this test's user only"""
+    image = Image.new("RGB", (32, 32))
+    image.putdata([tuple(random.randrange(256) for _ in range(3)) for _ in range(32 * 32)])
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    return login(ADMIN_EMAIL, ADMIN_PASSWORD)
+
+
+@pytest.fixture(scope="module")
+def user_headers():
+    return login(USER_EMAIL, USER_PASSWORD)
+
+
+@pytest.fixture(scope="module")
+def other_user_headers():
+    response = requests.post(f"{BASE_URL}/api/auth/register", json={
+        "email": f"test_blob_{int(time.time())}@example.com",
+        "full_name": "Blob Test User",
+        "password": "testpass123",
+        "referral_code": "MASTER01"
+    })
+    if response.status_code != 200:
+        pytest.skip("Registration failed")
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def screenshot(user_headers):
+    """Upload a screenshot for a new deposit; returns (plain blob path, signed link)"""
+    deposit = requests.post(f"{BASE_URL}/api/deposits", json={
+        "amount": 10.0,
+        "payment_method": "usdt",
+        "transaction_hash": "TEST_blob_access"
+    }, headers=user_headers)
+    assert deposit.status_code == 200
+    upload = requests.post(
+        f"{BASE_URL}/api/deposits/{deposit.json()['deposit_id']}/upload-screenshot",
+        files={"file": ("screenshot.png", random_png(), "image/png")},
+        headers=user_headers
+    )
+    assert upload.status_code == 200
+    signed = upload.json()["screenshot_url"]
+    assert "sig=" in signed
+    return signed.split("?")[0], signed
+
+
+class TestBlobAccess:
+    """Screenshots are private to the depositing user and admins"""
+
+    def test_anonymous_request_is_not_found(self, screenshot):
+        path, _ = screenshot
+        assert requests.get(f"{BASE_URL}{path}").status_code == 404
+        print(f"✓ Anonymous request gets 404")
+
+    def test_other_user_is_not_found(self, screenshot, other_user_headers):
+        path, _ = screenshot
+        assert requests.get(f"{BASE_URL}{path}", headers=other_user_headers).status_code == 404
+        print(f"✓ Other user gets 404")
+
+    def test_owner_and_admin_can_read(self, screenshot, user_headers, admin_headers):
+        path, _ = screenshot
+        assert requests.get(f"{BASE_URL}{path}", headers=user_headers).status_code == 200
+        assert requests.get(f"{BASE_URL}{path}", headers=admin_headers).status_code == 200
+        print(f"✓ Owner and admin can read")
+
+    def test_signed_link_is_checked(self, screenshot):
+        """The signed link works without a token; a tampered signature does not"""
+        _, signed = screenshot
+        assert requests.get(f"{BASE_URL}{signed}").status_code == 200
+        tampered = signed[:-1] + ("0" if signed[-1] != "0" else "1")
+        assert requests.get(f"{BASE_URL}{tampered}").status_code == 404
+        print(f"✓ Signed link is verified")
@@ -0,0 +1,169 @@
+"""
+MINEX GLOBAL Platform - Crypto Price Refresher Tests
+Testing: Background refresh, circuit breaker and staleness against a local stub CoinGecko server
+"""
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crypto_service import CryptoPriceService  # noqa: E402
+
+STUB_PORT = 8765
+
+
+class StubCoinGecko:
+    """Local stand-in for the /simple/price endpoint that can be switched to fail"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+        self.runner = None
+
+    async def handle(self, request):
+        self.calls += 1
+        if self.failing:
+            return web.json_response({"error": "unavailable"}, status=503)
+        return web.json_response({"bitcoin": {"usd": 65000.0 + self.calls, "usd_24h_change": 1.5}})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/api/v3/simple/price", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", STUB_PORT).start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+class TestCryptoRefresher:
+    """Test the background price refresher"""
+
+    def setup_method(self):
+        os.environ["COINGECKO_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/api/v3"
+        os.environ["CRYPTO_REFRESH_SECONDS"] = "0.05"
+
+    def teardown_method(self):
+        os.environ.pop("COINGECKO_BASE_URL", None)
+        os.environ.pop("CRYPTO_REFRESH_SECONDS", None)
+
+    def test_requests_read_memory_only(self):
+        """Prices come from the refresher; get_prices never calls upstream"""
+        async def scenario():
+            async with StubCoinGecko() as stub:
+                service = CryptoPriceService()
+                await service.start()
+                try:
+                    await wait_for(lambda: service.cache)
+                    calls = stub.calls
+                    prices = await asyncio.gather(*(service.get_prices() for _ in range(100)))
+                    assert stub.calls - calls <= 1, "Requests should not trigger fetches"
+                    assert prices[0][0]["name"] == "BTC"
+                    assert service.freshness()["stale"] is False
+                finally:
+                    await service.close()
+
+        asyncio.run(scenario())
+
+    def test_circuit_opens_and_serves_last_known_prices(self):
+        """Upstream failures open the circuit and stop fetching; last prices are still served"""
+        async def scenario():
+            async with StubCoinGecko() as stub:
+                service = CryptoPriceService()
+                service.breaker.max_delay = 5.0
+                await service.start()
+                try:
+                    await wait_for(lambda: service.cache)
+                    stub.failing = True
+                    await wait_for(lambda: service.breaker.state == "open")
+                    calls = stub.calls
+                    await asyncio.sleep(0.05)
+                    assert stub.calls == calls, "No upstream calls while the circuit is open"
+
+                    prices = await service.get_prices()
+                    assert prices[0]["name"] == "BTC", "Last known prices are still served"
+
+                    stub.failing = False
+                    service.breaker.opened_until = 0.0
+                    await wait_for(lambda: service.breaker.state == "closed")
+                finally:
+                    await service.close()
+
+        asyncio.run(scenario())
+
+    def test_freshness_reports_stale_prices(self):
+        """Prices older than two refresh intervals are reported stale"""
+        async def scenario():
+            async with StubCoinGecko() as stub:
+                service = CryptoPriceService()
+                await service.start()
+                try:
+                    await wait_for(lambda: service.cache)
+                    stub.failing = True
+                    await asyncio.sleep(0.3)
+                    freshness = service.freshness()
+                    assert freshness["updated_at"] is not None
+                    assert freshness["stale"] is True
+                finally:
+                    await service.close()
+
+        asyncio.run(scenario())
+
+    def test_payload_is_encoded_once_per_refresh(self):
+        """Cache hits return the same pre-encoded bytes and ETag until prices change"""
+        async def scenario():
+            async with StubCoinGecko():
+                service = CryptoPriceService()
+                await service.start()
+                try:
+                    await wait_for(lambda: service.cache)
+                    # Freeze the snapshot: stop the refresher but keep serving from memory
+                    service._refresher.cancel()
+                    await asyncio.gather(service._refresher, return_exceptions=True)
+
+                    body, etag = await service.get_payload()
+                    again, same_etag = await service.get_payload()
+                    assert again is body and same_etag == etag
+                    assert body.startswith(b'[{"name":"BTC"')
+
+                    await service._refresh()
+                    changed, new_etag = await service.get_payload()
+                    assert new_etag != etag and changed != body
+                finally:
+                    await service.close()
+
+        asyncio.run(scenario())
+
+    def test_coin_changes_notify_listeners(self):
+        """Replacing the coin list publishes the re-filtered prices like a refresh does"""
+        async def scenario():
+            async with StubCoinGecko():
+                service = CryptoPriceService()
+                await service.start()
+                try:
+                    await wait_for(lambda: service.cache)
+                    service._refresher.cancel()
+                    await asyncio.gather(service._refresher, return_exceptions=True)
+
+                    published = []
+                    service.on_update(published.append)
+                    service.set_coins([{"id": "bitcoin", "symbol": "xbt"}])
+                    assert len(published) == 1
+                    assert [p["name"] for p in published[0]] == ["XBT"]
+                finally:
+                    await service.close()
+
+        asyncio.run(scenario())
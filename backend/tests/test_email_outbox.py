@@ -0,0 +1,170 @@
+"""
+MINEX GLOBAL Platform - Email Outbox Tests
+Testing: Claiming, retry with backoff, dead-lettering, lease expiry, send timeouts
+and the message id handed to the sender for deduplication
+against a MongoDB test database (MONGO_URL, skipped when unreachable)
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_outbox import EmailOutbox, OutboxStatus, PermanentEmailError  # noqa: E402
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+TEST_DB = "minex_test_email_outbox"
+
+
+def run_with_outbox(scenario):
+    """Run scenario(outbox, failures) against an empty email_outbox collection"""
+    async def main():
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            client.close()
+            pytest.skip("MongoDB not reachable")
+        db = client[TEST_DB]
+        await db.email_outbox.delete_many({})
+        outbox = EmailOutbox()
+        outbox.set_db(db)
+        failures = []
+
+        async def on_failure(to_email, subject, html_content, email_type, error):
+            failures.append(error)
+
+        outbox._on_failure = on_failure
+        try:
+            await scenario(outbox, failures)
+        finally:
+            await db.email_outbox.delete_many({})
+            client.close()
+
+    asyncio.run(main())
+
+
+async def failing(*args):
+    raise RuntimeError("SMTP unavailable")
+
+
+class TestEmailOutbox:
+    """Test the durable email outbox"""
+
+    def test_claim_leases_due_messages_oldest_first(self):
+        """Each due message is leased to exactly one worker"""
+        async def scenario(outbox, failures):
+            first = await outbox.enqueue("a@example.com", "First", "<p>1</p>")
+            second = await outbox.enqueue("b@example.com", "Second", "<p>2</p>")
+
+            claimed = await outbox._claim("worker-1")
+            assert claimed["message_id"] == first
+            assert claimed["status"] == OutboxStatus.SENDING
+            assert claimed["lease_owner"] == "worker-1"
+            assert claimed["attempts"] == 1
+
+            assert (await outbox._claim("worker-2"))["message_id"] == second
+            assert await outbox._claim("worker-3") is None
+
+        run_with_outbox(scenario)
+
+    def test_failed_send_is_retried_with_backoff(self):
+        """A transient failure returns the message to the queue after a backoff delay"""
+        async def scenario(outbox, failures):
+            message_id = await outbox.enqueue("a@example.com", "Retry", "<p>retry</p>")
+            outbox._deliver = failing
+            before = datetime.now(timezone.utc)
+            await outbox._process("worker-1", await outbox._claim("worker-1"))
+
+            message = await outbox.db.email_outbox.find_one({"message_id": message_id}, {"_id": 0})
+            assert message["status"] == OutboxStatus.PENDING
+            assert message["lease_owner"] is None
+            assert message["last_error"] == "SMTP unavailable"
+            delay = (datetime.fromisoformat(message["next_attempt_at"]) - before).total_seconds()
+            assert outbox.backoff_base * 0.8 - 1 <= delay <= outbox.backoff_base * 1.2 + 1
+            assert failures == ["SMTP unavailable"], "Each failed attempt is recorded"
+            assert await outbox._claim("worker-1") is None, "Not due again before the backoff"
+
+        run_with_outbox(scenario)
+
+    def test_message_is_dead_lettered_after_max_attempts(self):
+        """The last allowed attempt, or a permanent error, dead-letters the message"""
+        async def scenario(outbox, failures):
+            outbox.max_attempts = 2
+            outbox.backoff_base = 0.0
+            outbox._deliver = failing
+            message_id = await outbox.enqueue("a@example.com", "Dead", "<p>dead</p>")
+            for _ in range(2):
+                await outbox._process("worker-1", await outbox._claim("worker-1"))
+
+            message = await outbox.db.email_outbox.find_one({"message_id": message_id}, {"_id": 0})
+            assert message["status"] == OutboxStatus.DEAD
+            assert message["attempts"] == 2
+            assert len(failures) == 2
+
+            async def rejected(*args):
+                raise PermanentEmailError("Invalid recipient")
+
+            outbox._deliver = rejected
+            permanent_id = await outbox.enqueue("bad", "Permanent", "<p>bad</p>")
+            await outbox._process("worker-1", await outbox._claim("worker-1"))
+            permanent = await outbox.db.email_outbox.find_one({"message_id": permanent_id}, {"_id": 0})
+            assert permanent["status"] == OutboxStatus.DEAD
+            assert permanent["attempts"] == 1
+
+            assert await outbox.retry_dead() == 2
+            assert (await outbox._claim("worker-1"))["attempts"] == 1
+
+        run_with_outbox(scenario)
+
+    def test_expired_lease_is_reclaimed_by_another_worker(self):
+        """A message held by a crashed worker is picked up once its lease lapses"""
+        async def scenario(outbox, failures):
+            message_id = await outbox.enqueue("a@example.com", "Lease", "<p>lease</p>")
+            stale = await outbox._claim("worker-1")
+            assert await outbox._claim("worker-2") is None, "Leased messages are not claimed twice"
+
+            expired = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+            await outbox.db.email_outbox.update_one({"message_id": message_id}, {"$set": {"lease_until": expired}})
+            reclaimed = await outbox._claim("worker-2")
+            assert reclaimed["lease_owner"] == "worker-2"
+            assert reclaimed["attempts"] == 2
+
+            # The first worker finishing late no longer owns the message
+            deliveries = []
+
+            async def delivered(*args):
+                deliveries.append(args)
+
+            outbox._deliver = delivered
+            await outbox._process("worker-1", stale)
+            assert await outbox.db.email_outbox.count_documents({"message_id": message_id}) == 1
+            await outbox._process("worker-2", reclaimed)
+            assert await outbox.db.email_outbox.count_documents({"message_id": message_id}) == 0
+            # Both attempts carry the message id, so the sender can deduplicate them
+            assert [args[-1] for args in deliveries] == [message_id, message_id]
+
+        run_with_outbox(scenario)
+
+    def test_send_times_out_before_the_lease(self):
+        """A hanging send is abandoned within the lease and retried"""
+        async def scenario(outbox, failures):
+            outbox.send_timeout = 0.05
+
+            async def hanging(*args):
+                await asyncio.sleep(5)
+
+            outbox._deliver = hanging
+            message_id = await outbox.enqueue("a@example.com", "Slow", "<p>slow</p>")
+            await asyncio.wait_for(outbox._process("worker-1", await outbox._claim("worker-1")), timeout=2)
+
+            message = await outbox.db.email_outbox.find_one({"message_id": message_id}, {"_id": 0})
+            assert message["status"] == OutboxStatus.PENDING
+            assert "timed out" in message["last_error"]
+            assert outbox.send_timeout < outbox.lease_seconds
+
+        run_with_outbox(scenario)
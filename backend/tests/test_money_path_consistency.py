@@ -0,0 +1,123 @@
+"""
+MINEX GLOBAL Platform - Money Path Consistency Tests
+Testing: Running totals, daily rollups and the ledger written on every money
+movement match what recompute/backfill derive from the source collections
+"""
+import pytest
+import requests
+import os
+from datetime import datetime, timezone
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://minex-platform.preview.emergentagent.com').rstrip('/')
+
+ADMIN_EMAIL = "admin@minex.online"
+ADMIN_PASSWORD = "password"
+USER_EMAIL = "masteruser@gmail.com"
+USER_PASSWORD = "password"
+
+
+def login(email, password):
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password})
+    if response.status_code != 200:
+        pytest.skip(f"Login failed for {email}")
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    return login(ADMIN_EMAIL, ADMIN_PASSWORD)
+
+
+@pytest.fixture(scope="module")
+def user_headers():
+    return login(USER_EMAIL, USER_PASSWORD)
+
+
+@pytest.fixture(scope="module")
+def money_moves(admin_headers, user_headers):
+    """Run a deposit, a stake (commissions), an ROI distribution and a withdrawal"""
+    deposit = requests.post(f"{BASE_URL}/api/deposits", json={
+        "amount": 100.0,
+        "payment_method": "usdt",
+        "transaction_hash": "TEST_consistency"
+    }, headers=user_headers)
+    assert deposit.status_code == 200
+    approved = requests.post(
+        f"{BASE_URL}/api/admin/deposits/{deposit.json()['deposit_id']}/approve",
+        headers=admin_headers
+    )
+    assert approved.status_code == 200
+
+    packages = requests.get(f"{BASE_URL}/api/investment/packages").json()
+    if packages:
+        # Commissions are paid to the upline when the stake is activated
+        requests.post(f"{BASE_URL}/api/staking", json={
+            "package_id": packages[0]["package_id"],
+            "amount": max(packages[0].get("min_investment", 0), 50.0)
+        }, headers=user_headers)
+
+    roi = requests.post(f"{BASE_URL}/api/admin/calculate-roi", headers=admin_headers)
+    assert roi.status_code == 200
+
+    # Withdrawals are only accepted on configured days; approve one when allowed
+    withdrawal = requests.post(f"{BASE_URL}/api/withdrawals", json={
+        "amount": 0.01,
+        "wallet_address": "TEST_consistency_wallet"
+    }, headers=user_headers)
+    if withdrawal.status_code == 200:
+        requests.post(
+            f"{BASE_URL}/api/admin/withdrawals/{withdrawal.json()['withdrawal_id']}/approve",
+            params={"transaction_hash": "TEST_consistency"},
+            headers=admin_headers
+        )
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class TestMoneyPathConsistency:
+    """Incremental writes agree with a rebuild from the source collections"""
+
+    def test_platform_stats_match_recompute(self, admin_headers, money_moves):
+        """Running totals equal the totals recomputed from deposits, withdrawals, ROI and commissions"""
+        response = requests.post(
+            f"{BASE_URL}/api/admin/platform-stats/verify",
+            params={"fix": "false"},
+            headers=admin_headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["consistent"] is True, f"Platform stats drift: {data['drift']}"
+        assert data["stats"]["total_deposits"] >= 100.0
+        print(f"✓ Platform stats match recompute")
+
+    def test_daily_rollups_match_backfill(self, admin_headers, money_moves):
+        """Today's incremental rollups are unchanged by a backfill from raw history"""
+        params = {"start_date": money_moves, "end_date": money_moves}
+        before = requests.get(f"{BASE_URL}/api/admin/analytics/daily", params=params, headers=admin_headers)
+        assert before.status_code == 200
+
+        backfill = requests.post(f"{BASE_URL}/api/admin/analytics/backfill", headers=admin_headers)
+        assert backfill.status_code == 200
+
+        after = requests.get(f"{BASE_URL}/api/admin/analytics/daily", params=params, headers=admin_headers)
+        assert after.status_code == 200
+        for metric in ("deposits", "withdrawals", "roi_paid", "commissions"):
+            recorded = {d["date"]: (d["count"], round(d["total"], 6)) for d in before.json()["series"][metric]}
+            rebuilt = {d["date"]: (d["count"], round(d["total"], 6)) for d in after.json()["series"][metric]}
+            assert recorded == rebuilt, f"{metric} rollup differs from backfill"
+        assert before.json()["series"]["deposits"], "Expected today's deposit rollup"
+        print(f"✓ Daily rollups match backfill")
+
+    def test_ledger_matches_backfill(self, admin_headers, user_headers, money_moves):
+        """Entries appended on each money movement are unchanged by a ledger backfill"""
+        before = requests.get(f"{BASE_URL}/api/user/transactions", headers=user_headers)
+        assert before.status_code == 200
+
+        backfill = requests.post(f"{BASE_URL}/api/admin/ledger/backfill", headers=admin_headers)
+        assert backfill.status_code == 200
+
+        after = requests.get(f"{BASE_URL}/api/user/transactions", headers=user_headers)
+        assert after.status_code == 200
+        assert before.json() == after.json(), "Ledger differs from backfill"
+        types = {t["type"] for t in before.json()}
+        assert {"deposit", "roi"} <= types, f"Expected deposit and ROI entries, got {types}"
+        print(f"✓ Ledger matches backfill")
@@ -0,0 +1,60 @@
+"""
+TTL Cache for MINEX GLOBAL Platform
+Thread-safe bounded LRU whose entries carry their own expiry time;
+shared by the authenticated user cache and the verified token cache
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def store(self, key: str, value: Any, expires_at: float):
+        """Insert or replace an entry, evicting the least recently used beyond maxsize"""
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> bool:
+        """Drop an entry; True if it was cached"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
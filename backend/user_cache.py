@@ -0,0 +1,47 @@
+"""
+Authenticated User Cache for MINEX GLOBAL Platform
+Small in-process LRU cache with a short TTL for the user document
+loaded on every authenticated request. The cache is per process:
+invalidate() only reaches the worker that calls it, so other workers can
+serve the old document until the TTL expires. Handlers that read or check
+balances must query them from the database, never from the cached user.
+"""
+import os
+from typing import Optional
+
+from ttl_cache import TTLCache
+
+# The referral arrays grow with the team; handlers that need them query them directly
+LEAN_USER_PROJECTION = {"_id": 0, "direct_referrals": 0, "indirect_referrals": 0}
+
+
+class UserCache(TTLCache):
+    def __init__(self, maxsize: int = 10000, ttl_seconds: float = 5.0):
+        super().__init__(maxsize)
+        self.ttl_seconds = ttl_seconds
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """Return a copy of the cached user document, or None if missing/expired"""
+        user = self.lookup(user_id)
+        return dict(user) if user is not None else None
+
+    def put(self, user_id: str, user: dict):
+        self.store(user_id, dict(user), self.clock() + self.ttl_seconds)
+
+    def invalidate(self, user_id: str):
+        """Drop a user after a balance, level or password change"""
+        if self.discard(user_id):
+            self.invalidations += 1
+
+    def configure_from_env(self):
+        """Apply USER_CACHE_SIZE / USER_CACHE_TTL_SECONDS once the environment is loaded"""
+        self.maxsize = int(os.environ.get("USER_CACHE_SIZE", self.maxsize))
+        self.ttl_seconds = float(os.environ.get("USER_CACHE_TTL_SECONDS", self.ttl_seconds))
+
+    def stats(self) -> dict:
+        return {**super().stats(), "ttl_seconds": self.ttl_seconds, "invalidations": self.invalidations}
+
+
+# Global instance
+user_cache = UserCache()
@@ -75,6 +75,13 @@ export const settingsAPI = {
 
 export const cryptoAPI = {
   getPrices: () => api.get('/crypto/prices'),
+  streamUrl: () => `${API}/crypto/prices/stream`,
+  getPrice: (symbol) => api.get(`/crypto/prices/${symbol}`),
+  getHistory: (symbol, range = '1d') => api.get(`/crypto/history/${symbol}`, { params: { range } }),
+  getCoins: () => api.get('/admin/crypto/coins'),
+  updateCoins: (coins) => api.put('/admin/crypto/coins', coins),
+  getPortfolioValuation: (symbols = 'BTC,ETH') => api.get('/user/portfolio/valuation', { params: { symbols } }),
+  getLiabilitiesValuation: (symbols = 'BTC,ETH') => api.get('/admin/platform/liabilities/valuation', { params: { symbols } }),
 };
 
 export const adminAPI = {
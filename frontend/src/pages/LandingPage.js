@@ -82,7 +82,17 @@ const LandingPage = () => {
   useEffect(() => {
     loadPackages();
     loadCryptoPrices();
-    // Refresh prices every 60 seconds
+    // Live updates pushed by the server; fall back to polling every 60 seconds
+    if (typeof EventSource !== 'undefined') {
+      const source = new EventSource(cryptoAPI.streamUrl());
+      source.addEventListener('prices', (event) => {
+        const prices = JSON.parse(event.data);
+        if (prices.length > 0) {
+          setCryptoData(prices);
+        }
+      });
+      return () => source.close();
+    }
     const interval = setInterval(loadCryptoPrices, 60000);
     return () => clearInterval(interval);
   }, []);
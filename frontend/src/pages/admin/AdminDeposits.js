@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { adminAPI } from '@/api';
-import { formatCurrency, formatDateTime } from '@/utils';
+import { formatCurrency, formatDateTime, assetUrl } from '@/utils';
 import { toast } from 'sonner';
 import { CheckCircle, XCircle, Eye, Clock } from 'lucide-react';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '../../components/ui/dialog';
@@ -223,10 +223,11 @@ const AdminDeposits = () => {
                     <div className="text-sm text-gray-400 mb-2">Transaction Screenshot</div>
                     <div className="border border-white/10 rounded-lg p-2 max-h-[400px] overflow-y-auto">
                       <img 
-                        src={selectedDeposit.screenshot_url} 
+                        src={assetUrl(selectedDeposit.screenshot_thumbnail_url || selectedDeposit.screenshot_url)} 
+                        loading="lazy"
                         alt="Transaction" 
                         className="w-full h-auto rounded cursor-pointer hover:opacity-90 transition"
-                        onClick={() => window.open(selectedDeposit.screenshot_url, '_blank')}
+                        onClick={() => window.open(assetUrl(selectedDeposit.screenshot_url), '_blank')}
                       />
                     </div>
                     <p className="text-xs text-gray-500 mt-1">Click image to open full size</p>
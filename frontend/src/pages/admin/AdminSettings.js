@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { adminAPI } from '@/api';
 import { toast } from 'sonner';
+import { assetUrl } from '@/utils';
 import { Save, Settings as SettingsIcon, Upload, Image, X, Calendar, Calculator, Clock, Play, Mail } from 'lucide-react';
 
 const AdminSettings = () => {
@@ -171,7 +172,7 @@ const AdminSettings = () => {
                   className="flex-shrink-0 w-32 h-32 bg-gray-900/50 border border-dashed border-gray-700 rounded-xl flex items-center justify-center cursor-pointer hover:border-blue-500/50 transition-colors overflow-hidden"
                 >
                   {settings.qr_code_image ? (
-                    <img src={settings.qr_code_image} alt="QR Code" className="w-full h-full object-contain" />
+                    <img src={assetUrl(settings.qr_code_image)} alt="QR Code" className="w-full h-full object-contain" />
                   ) : (
                     <div className="text-center">
                       <Image className="w-8 h-8 text-gray-600 mx-auto mb-2" />
@@ -3,7 +3,7 @@ import { motion } from 'framer-motion';
 import { Upload, AlertCircle, Copy } from 'lucide-react';
 import { QRCodeSVG } from 'qrcode.react';
 import { depositAPI, settingsAPI } from '@/api';
-import { formatCurrency, formatDateTime, copyToClipboard } from '@/utils';
+import { formatCurrency, formatDateTime, copyToClipboard, assetUrl } from '@/utils';
 import { toast } from 'sonner';
 
 const DepositPage = () => {
@@ -127,7 +127,7 @@ const DepositPage = () => {
                   <div className="flex justify-center mb-4">
                     <div className="p-4 bg-white rounded-xl">
                       {settings?.qr_code_image ? (
-                        <img src={settings.qr_code_image} alt="Payment QR Code" className="w-[180px] h-[180px] object-contain" />
+                        <img src={assetUrl(settings.qr_code_image)} alt="Payment QR Code" className="w-[180px] h-[180px] object-contain" />
                       ) : (
                         <QRCodeSVG value={settings?.usdt_wallet_address || ''} size={180} />
                       )}
@@ -1,4 +1,11 @@
 // Utility functions
+
+// Resolve backend-relative asset paths (e.g. /api/blobs/...) against the API host
+export const assetUrl = (url) => {
+  if (!url || !url.startsWith('/')) return url;
+  return `${process.env.REACT_APP_BACKEND_URL || ''}${url}`;
+};
+
 export const formatCurrency = (amount) => {
   return new Intl.NumberFormat('en-US', {
     style: 'currency',